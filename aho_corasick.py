@@ -0,0 +1,83 @@
+from collections import deque
+
+
+class AhoCorasick:
+    """An Aho-Corasick automaton, which finds all occurrences of a set of search terms in a text in a single pass
+    over the text. The effort depends on the length of the text and the number of occurrences, but not on the
+    number of search terms.
+
+    The automaton is a trie of the search terms. Each node has a failure link to the node of the longest proper
+    suffix of its text that is also in the trie, and the list of search terms ending at the node.
+    """
+
+    def __init__(self, patterns, min_length=1):
+        """The constructor. Builds the automaton.
+
+        :param patterns:A dictionary with the search terms as keys and their IDs as values.
+        :param min_length:The minimum length of a search term. Shorter search terms are not searched. Default = 1.
+        """
+        try:
+            self.goto = [{}]
+            self.fail = [0]
+            self.output = [[]]
+
+            for pattern, id in patterns.items():
+                if len(pattern) < min_length:
+                    continue
+
+                node = 0
+                for c in pattern:
+                    next_node = self.goto[node].get(c)
+
+                    if next_node is None:
+                        next_node = len(self.goto)
+                        self.goto[node][c] = next_node
+                        self.goto.append({})
+                        self.fail.append(0)
+                        self.output.append([])
+
+                    node = next_node
+
+                self.output[node].append((len(pattern), id))
+
+            # the failure links are set in breadth-first order, so the links of shorter texts are known
+            queue = deque(self.goto[0].values())
+
+            while queue:
+                node = queue.popleft()
+
+                for c, child in self.goto[node].items():
+                    queue.append(child)
+
+                    fail = self.fail[node]
+                    while fail and c not in self.goto[fail]:
+                        fail = self.fail[fail]
+
+                    self.fail[child] = self.goto[fail].get(c, 0)
+                    self.output[child] = self.output[child] + self.output[self.fail[child]]
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'aho_corasick.py'))
+
+    def search(self, text):
+        """Finds all occurrences of the search terms in the passed text, including overlapping ones.
+
+        :param text:The text to be searched.
+        :return:A list of occurrences (start, end, id), where text[start:end] is the search term.
+        """
+        try:
+            matches = []
+            node = 0
+
+            for i, c in enumerate(text):
+                while node and c not in self.goto[node]:
+                    node = self.fail[node]
+
+                node = self.goto[node].get(c, 0)
+
+                for length, id in self.output[node]:
+                    matches.append((i + 1 - length, i + 1, id))
+
+            return matches
+        except:
+            print('Error in method {0} in module {1}'.format('search', 'aho_corasick.py'))
+            return None
@@ -0,0 +1,181 @@
+""" Function of batch_scanner.py
+Examines large numbers of images with a pool of worker processes. Keras inference and the post-processing
+of the boxes hold the GIL, so a single process uses only part of a machine with many cores.
+
+Each worker process builds its own scanner (detector, recognizer and ingredients) once when it starts and then
+handles a stream of images. The number of threads TensorFlow may use is limited per worker, so that the workers
+do not compete for the cores.
+
+The worker processes are spawned. Scripts using the batch scanner must therefore create it within
+if __name__ == '__main__'.
+"""
+import multiprocessing
+import os
+
+import constant as const
+from ingrediens import Ingredients
+
+worker_scanner = None
+"""The scanner of the current worker process"""
+worker_kwargs = {}
+"""The arguments passed to the scanner of the current worker process for every image"""
+
+
+def init_worker(usePatch, intra_op_threads, inter_op_threads, kwargs):
+    """Initializes a worker process. The thread limits of TensorFlow are set before the models are loaded.
+    Afterwards the scanner of the worker is created.
+
+    :param usePatch:If true, umlauts are treated as a, o and u
+    :param intra_op_threads:Number of threads TensorFlow may use within one operation.
+    :param inter_op_threads:Number of threads TensorFlow may use for independent operations.
+    :param kwargs:Further arguments passed to the scanner for every image (e.g. pos_annotation_constants).
+    """
+    global worker_scanner, worker_kwargs
+
+    try:
+        os.environ['OMP_NUM_THREADS'] = str(intra_op_threads)
+
+        # TensorFlow is only imported in the workers, the parent process does not need it
+        import cv2
+        import keras.backend as K
+        import tensorflow as tf
+
+        cv2.setNumThreads(1)
+
+        config = tf.ConfigProto(intra_op_parallelism_threads=intra_op_threads,
+                                inter_op_parallelism_threads=inter_op_threads)
+        K.set_session(tf.Session(config=config))
+
+        from scanner import Scanner
+
+        worker_scanner = Scanner(refresh_db=False, usePatch=usePatch)
+        worker_kwargs = kwargs
+    except:
+        print('Error in method {0} in module {1}'.format('init_worker', 'batch_scanner.py'))
+
+
+def scann_file(task):
+    """Examines one image in a worker process.
+
+    :param task:A tuple with the position, the input image (path) and the output image (path or None).
+    :return:An instance of the class ScanResult.
+    """
+    try:
+        index, input_file, output_file = task
+
+        result = worker_scanner.scann_file(input_file, output_file, **worker_kwargs)
+        result.index = index
+
+        return result
+    except:
+        print('Error in method {0} in module {1}'.format('scann_file', 'batch_scanner.py'))
+        return None
+
+
+class BatchScanner:
+    """Examines images with a pool of worker processes. Each worker loads the models and the database once.
+    The results are returned to the parent process in the order of the input images.
+
+    The batch scanner should be closed after use. It can be used in a with statement for this purpose.
+    """
+
+    def __init__(self, workers=None, intra_op_threads=None, inter_op_threads=None, refresh_db=False,
+                 usePatch=False, **kwargs):
+        """The constructor. Starts the worker processes.
+
+        :param workers:Number of worker processes. Default = BATCH_WORKERS.
+        :param intra_op_threads:Number of threads TensorFlow may use within one operation per worker.
+        Default = BATCH_INTRA_OP_THREADS.
+        :param inter_op_threads:Number of threads TensorFlow may use for independent operations per worker.
+        Default = BATCH_INTER_OP_THREADS.
+        :param refresh_db:If True, the database is updated once using the stored Excel file before the workers
+        are started.
+        :param usePatch:If true, umlauts are treated as a, o and u
+        :param kwargs:Further arguments as for scann of the scanner (e.g. pos_annotation_constants).
+        """
+        try:
+            if workers is None:
+                workers = const.BATCH_WORKERS if const.BATCH_WORKERS is not None else os.cpu_count()
+            if intra_op_threads is None:
+                intra_op_threads = const.BATCH_INTRA_OP_THREADS
+            if inter_op_threads is None:
+                inter_op_threads = const.BATCH_INTER_OP_THREADS
+
+            # The workers must not convert the Excel file at the same time
+            if refresh_db == True:
+                Ingredients.convert(const.DATABASE_EXCEL, const.DATABASE_JSON)
+
+            # Processes are spawned, because TensorFlow does not survive a fork
+            context = multiprocessing.get_context('spawn')
+
+            self.workers = workers
+            self.pool = context.Pool(processes=workers, initializer=init_worker,
+                                     initargs=(usePatch, intra_op_threads, inter_op_threads, kwargs))
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'batch_scanner.py'))
+
+    def __enter__(self):
+        """Returns the batch scanner for use in a with statement.
+
+        :return:The batch scanner.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Closes the batch scanner at the end of a with statement. If an error occurred, the workers are
+        terminated immediately.
+        """
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def scann(self, input_files, output_files=None, chunksize=1):
+        """Examines the passed images with the worker processes.
+
+        :param input_files:A list of input images (paths).
+        :param output_files:An optional list of output images (paths). If None, the annotated images are returned
+        in the results.
+        :param chunksize:Number of images handed to a worker at once. Default = 1.
+        :return:A list of instances of the class ScanResult in the order of the input images.
+        """
+        try:
+            return list(self.imap(input_files, output_files, chunksize))
+        except:
+            print('Error in method {0} in module {1}'.format('scann', 'batch_scanner.py'))
+            return None
+
+    def imap(self, input_files, output_files=None, chunksize=1):
+        """Examines the passed images with the worker processes and returns the results one after the other as
+        soon as they are available. This way, the results of very long lists do not have to be kept in memory.
+
+        :param input_files:An iterable of input images (paths).
+        :param output_files:An optional iterable of output images (paths).
+        :param chunksize:Number of images handed to a worker at once. Default = 1.
+        :return:A generator of instances of the class ScanResult in the order of the input images.
+        """
+        if output_files is None:
+            tasks = ((index, input_file, None) for index, input_file in enumerate(input_files))
+        else:
+            tasks = ((index, input_file, output_file)
+                     for index, (input_file, output_file) in enumerate(zip(input_files, output_files)))
+
+        return self.pool.imap(scann_file, tasks, chunksize)
+
+    def close(self):
+        """Waits until all workers have finished their images and shuts them down.
+        """
+        try:
+            self.pool.close()
+            self.pool.join()
+        except:
+            print('Error in method {0} in module {1}'.format('close', 'batch_scanner.py'))
+
+    def terminate(self):
+        """Shuts down all workers immediately. Images still being processed are discarded.
+        """
+        try:
+            self.pool.terminate()
+            self.pool.join()
+        except:
+            print('Error in method {0} in module {1}'.format('terminate', 'batch_scanner.py'))
@@ -8,12 +8,68 @@ GPU_LIST = '0'
 CRNN_Model_Path = 'bridges/models/crnn/pretrained/model.hdf5'
 """Path to CRNN model (model and weights)
 """
+CRNN_MAX_BATCH_SIZE = 64
+"""Maximum number of text images passed to the CRNN model in one forward pass
+"""
+CRNN_CTC_DECODER = 'greedy'
+"""Decoder for the output of the CRNN model: greedy (NumPy), keras_greedy or beam_search (both Keras)
+"""
+CRNN_BEAM_WIDTH = 100
+"""Beam width of the beam_search decoder
+"""
 EAST_MODEL_PATH = 'bridges/models/east/pretrained/model.h5'
 """Path to EAST model (model)
 """
 EAST_JSON_PATH = 'bridges/models/east/pretrained/model.json'
 """Path to EAST model (weights)
 """
+EAST_SCORE_MAP_THRESH = 0.8
+"""Threshold for the score map of the EAST model
+"""
+EAST_BOX_THRESH = 0.1
+"""Threshold for the average score of a box of the EAST model
+"""
+EAST_NMS_THRES = 0.2
+"""Threshold for the nms of the EAST model
+"""
+EAST_NMS = 'lanms'
+"""NMS of the EAST model: lanms (C++, falls back to numpy if it cannot be built) or numpy
+"""
+EAST_BATCH_SIZE = 4
+"""Maximum number of images (or tiles) passed to the EAST model in one forward pass
+"""
+EAST_TILED = False
+"""If True, images whose longest side exceeds EAST_TILE_SIZE are examined in overlapping tiles
+"""
+EAST_TILE_SIZE = 1024
+"""Edge length of the tiles (a multiple of 32, at most 2400)
+"""
+EAST_TILE_OVERLAP = 128
+"""Minimum overlap of neighbouring tiles, should exceed the length of the longest word
+"""
+EAST_COARSE_TO_FINE = False
+"""If True, text regions are first searched in a reduced copy of the image and only these regions are examined
+at full resolution
+"""
+EAST_COARSE_SIDE = 512
+"""Longest side of the reduced copy of the image in the first pass (a multiple of 32)
+"""
+EAST_COARSE_SCORE_THRESH = 0.5
+"""Threshold for the score map in the first pass, lower than in detect so that small print is not missed
+"""
+EAST_COARSE_PADDING = 32
+"""Margin in pixels added around each region found in the first pass
+"""
 EAST_OPENCV_MODEL_PATH = 'bridges/models/east_open_cv/pretrained/frozen_east_text_detection.pb'
 """Path to the weights of the EAST model from Open CV
 """
+EAST_OPENCV_RESOLUTION = 320
+"""Input size of the EAST model from Open CV (320, 640, 1280 or another multiple of 32)
+"""
+EAST_OPENCV_KEEP_ASPECT = False
+"""If True, the longest side of an image is resized to EAST_OPENCV_RESOLUTION and the aspect ratio is kept,
+otherwise the image is resized to a square
+"""
+EAST_OPENCV_NMS = 'imutils'
+"""NMS of the EAST model from Open CV: imutils (original) or opencv (cv2.dnn.NMSBoxes)
+"""
@@ -14,6 +14,7 @@ import argparse
 import string
 
 import keras.backend as K
+import tensorflow as tf
 
 import bridges_config as config
 from crnn.models import CRNN_STN
@@ -27,14 +28,19 @@ class CrnnBridge:
     def __init__(self):
         """The constructor
         """
+        self.cfg = self.crnn_cfg()
         self.load_model()
 
     def load_model(self):
         """Generates the model based on the transferred parameters and loads the pre-trained weights.
         """
         try:
-            self.model = CRNN_STN(self.crnn_cfg())
+            self.model = CRNN_STN(self.cfg)
             self.model.load_weights(config.CRNN_Model_Path)
+
+            # Build the prediction function now and remember the graph, so the model can be used by other threads
+            self.model._make_predict_function()
+            self.graph = tf.get_default_graph()
         except:
             print('Error in method {0} in module {1}'.format('load_model', 'crnn_bridge.py'))
 
@@ -49,19 +55,150 @@ class CrnnBridge:
         try:
             img = self.preprocess_image(image)
 
-            y_pred = self.model.predict(img[np.newaxis, :, :, :])
+            with self.graph.as_default():
+                y_pred = self.model.predict(img[np.newaxis, :, :, :])
+
+            return self.decode(y_pred)[0]
+        except:
+            print('Error in method {0} in module {1}'.format('scann', 'crnn_bridge.py'))
+            return None
+
+    def scann_batch(self, images, max_batch_size=None):
+        """Examines all passed images with a single prediction of the model and returns the predicted texts
+        in the order of the images. The images are preprocessed into one tensor of the shape
+        (N, width, height, channels), which is passed to the model in chunks of at most max_batch_size images.
+
+        If an image cannot be preprocessed, None is returned at its position.
+
+        :param images:A list of images (raster images) to be examined.
+        :param max_batch_size:The maximum number of images per forward pass. Default = CRNN_MAX_BATCH_SIZE.
+        :return:A list with the predicted texts as strings.
+        """
+        try:
+            if max_batch_size is None:
+                max_batch_size = config.CRNN_MAX_BATCH_SIZE
+
+            texts = [None] * len(images)
+
+            preprocessed = [self.preprocess_image(image) for image in images]
+            valid = [i for i, img in enumerate(preprocessed) if img is not None]
+
+            if len(valid) == 0:
+                return texts
+
+            for i, text in zip(valid, self.predict_preprocessed([preprocessed[i] for i in valid], max_batch_size)):
+                texts[i] = text
 
+            return texts
+        except:
+            print('Error in method {0} in module {1}'.format('scann_batch', 'crnn_bridge.py'))
+            return None
+
+    def predict_preprocessed(self, images, max_batch_size=None):
+        """Predicts the texts of images that were already preprocessed (see preprocess_image).
+
+        :param images:A list of preprocessed images.
+        :param max_batch_size:The maximum number of images per forward pass. Default = CRNN_MAX_BATCH_SIZE.
+        :return:A list with the predicted texts as strings.
+        """
+        try:
+            if max_batch_size is None:
+                max_batch_size = config.CRNN_MAX_BATCH_SIZE
+
+            batch = np.stack(images)
+            with self.graph.as_default():
+                y_pred = self.model.predict(batch, batch_size=max_batch_size)
+
+            return self.decode(y_pred)
+        except:
+            print('Error in method {0} in module {1}'.format('predict_preprocessed', 'crnn_bridge.py'))
+            return None
+
+    def stage_config(self):
+        """Returns the configuration of the stages of the bridge. If it changes, stored results of the stage
+        are no longer valid.
+
+        :return:A dictionary with the configuration of the stage recognize.
+        """
+        try:
+            return {'recognize': {'model': config.CRNN_Model_Path,
+                                  'decoder': config.CRNN_CTC_DECODER,
+                                  'beam_width': config.CRNN_BEAM_WIDTH}}
+        except:
+            print('Error in method {0} in module {1}'.format('stage_config', 'crnn_bridge.py'))
+            return None
+
+    def decode(self, y_pred, decoder=None):
+        """Decodes the output of the model into texts. The decoder used is defined in CRNN_CTC_DECODER. The
+        first two time steps are discarded because the first outputs of the RNN tend to be garbage.
+
+        :param y_pred:The output of the model in the form (batch, timesteps, classes).
+        :param decoder:The decoder to be used (greedy, keras_greedy or beam_search). Default = CRNN_CTC_DECODER.
+        :return:A list with the decoded texts as strings.
+        """
+        try:
+            if decoder is None:
+                decoder = config.CRNN_CTC_DECODER
+
+            if decoder == 'greedy':
+                return self.decode_greedy(y_pred)
+            else:
+                return self.decode_keras(y_pred, greedy=(decoder == 'keras_greedy'))
+        except:
+            print('Error in method {0} in module {1}'.format('decode', 'crnn_bridge.py'))
+            return None
+
+    def decode_greedy(self, y_pred):
+        """Decodes the output of the model with a greedy CTC decoder implemented in NumPy. For each time step
+        the most probable class is taken, repetitions are collapsed and blanks (the last class) are dropped.
+
+        Unlike K.ctc_decode, no new operations are added to the graph of TensorFlow, so the duration of a call
+        does not grow over the lifetime of the process.
+
+        :param y_pred:The output of the model in the form (batch, timesteps, classes).
+        :return:A list with the decoded texts as strings.
+        """
+        try:
+            best = np.argmax(y_pred[:, 2:, :], axis=2)
+            blank = y_pred.shape[2] - 1
+
+            # keep the first of several identical classes in a row and drop all blanks
+            keep = np.ones(best.shape, dtype=bool)
+            keep[:, 1:] = best[:, 1:] != best[:, :-1]
+            keep &= best != blank
+
+            characters = np.array(list(self.cfg.characters))
+
+            result_str = [''.join(characters[row[mask][:self.cfg.label_len]]) for row, mask in zip(best, keep)]
+            result_str = [x.replace('-', '') for x in result_str]
+
+            return result_str
+        except:
+            print('Error in method {0} in module {1}'.format('decode_greedy', 'crnn_bridge.py'))
+            return None
+
+    def decode_keras(self, y_pred, greedy=True):
+        """External code (add try...except and an extension for batches)
+        Decodes the output of the model with the CTC decoder of Keras.
+
+        :param y_pred:The output of the model in the form (batch, timesteps, classes).
+        :param greedy:If True, a greedy search is performed, otherwise a beam search with CRNN_BEAM_WIDTH.
+        :return:A list with the decoded texts as strings.
+        """
+        try:
             # The CTC loss is calculated via Keras by TensoFlow.
             shape = y_pred[:, 2:, :].shape
-            ctc_decode = K.ctc_decode(y_pred[:, 2:, :], input_length=np.ones(shape[0]) * shape[1])[0][0]
-            ctc_out = K.get_value(ctc_decode)[:, :self.crnn_cfg().label_len]
+            with self.graph.as_default():
+                ctc_decode = K.ctc_decode(y_pred[:, 2:, :], input_length=np.ones(shape[0]) * shape[1], greedy=greedy,
+                                          beam_width=config.CRNN_BEAM_WIDTH)[0][0]
+                ctc_out = K.get_value(ctc_decode)[:, :self.cfg.label_len]
 
-            result_str = ''.join([self.crnn_cfg().characters[c] for c in ctc_out[0]])
-            result_str = result_str.replace('-', '')
+            result_str = [''.join([self.cfg.characters[c] for c in row]) for row in ctc_out]
+            result_str = [x.replace('-', '') for x in result_str]
 
             return result_str
         except:
-            print('Error in method {0} in module {1}'.format('scann', 'crnn_bridge.py'))
+            print('Error in method {0} in module {1}'.format('decode_keras', 'crnn_bridge.py'))
             return None
 
     def crnn_cfg(self):
@@ -103,17 +240,17 @@ class CrnnBridge:
         # if channel 1 then as grayscale
         try:
             if img.shape[1] / img.shape[0] < 6.4:
-                img = pad_image(img, (self.crnn_cfg().width, self.crnn_cfg().height), self.crnn_cfg().nb_channels)
+                img = pad_image(img, (self.cfg.width, self.cfg.height), self.cfg.nb_channels)
             else:
-                img = resize_image(img, (self.crnn_cfg().width, self.crnn_cfg().height))
-            if self.crnn_cfg().nb_channels == 1:
+                img = resize_image(img, (self.cfg.width, self.cfg.height))
+            if self.cfg.nb_channels == 1:
                 img = img.transpose([1, 0])
             else:
                 img = img.transpose([1, 0, 2])
 
             img = np.flip(img, 1)
             img = img / 255.0
-            if self.crnn_cfg().nb_channels == 1:
+            if self.cfg.nb_channels == 1:
                 img = img[:, :, np.newaxis]
             return img
         except:
@@ -22,6 +22,7 @@ import bridges_config as config
 sys.path.append('/bridges/models')
 import east.lanms as east_lanms
 import east.model as east_model
+import east.numpy_nms as east_nms
 from data_processor import restore_rectangle
 
 
@@ -32,6 +33,7 @@ class EastBridge:
     def __init__(self):
         """The constructor
         """
+        self.nms = config.EAST_NMS
         self.load_model()
 
     def load_model(self):
@@ -45,25 +47,452 @@ class EastBridge:
             self.model = model_from_json(loaded_model_json,
                                          custom_objects={'tf': tf, 'RESIZE_FACTOR': east_model.RESIZE_FACTOR})
             self.model.load_weights(config.EAST_MODEL_PATH)
+
+            # Build the prediction function now and remember the graph, so the model can be used by other threads
+            self.model._make_predict_function()
+            self.graph = tf.get_default_graph()
         except:
             print('Error in method {0} in module {1}'.format('load_model', 'east_bridge.py'))
 
     def scann(self, image):
-        """External code (add try...except and an extension)
-        Examines the passed image for text regions and returns them as a collection of boxes in the
+        """Examines the passed image for text regions and returns them as a collection of boxes in the
         form of a NumPy array. The passed image must be a raster image.
 
         :param image:The image to be examined
         :return:A NumPy array of predicted text areas.
         """
         try:
+            return self.scann_measured(image)[0]
+        except:
+            print('Error in method {0} in module {1}'.format('scann', 'east_bridge.py'))
+            return None
+
+    def scann_measured(self, image):
+        """External code (add try...except and an extension)
+        Examines the passed image like scann and also returns the share of the work done, i.e. the pixels passed
+        through the model relative to a single pass over the whole image.
+
+        If EAST_COARSE_TO_FINE is set, the image is examined in two passes (see scann_coarse_to_fine). If
+        EAST_TILED is set, images whose longest side exceeds EAST_TILE_SIZE are examined in tiles
+        (see scann_tiled).
+
+        :param image:The image to be examined
+        :return:A NumPy array of predicted text areas and the processed area ratio (1.0 for a single pass, more
+        than 1.0 for tiles, because they overlap).
+        """
+        try:
+            if config.EAST_COARSE_TO_FINE:
+                return self.scann_coarse_to_fine(image)
+
+            if config.EAST_TILED and max(image.shape[:2]) > config.EAST_TILE_SIZE:
+                return self.scann_tiled(image)
+
             img_resized, (ratio_h, ratio_w) = self.resize_image(image)
             img_resized = (img_resized / 127.5) - 1
 
-            score_map, geo_map = self.model.predict(img_resized[np.newaxis, :, :, :])
+            with self.graph.as_default():
+                score_map, geo_map = self.model.predict(img_resized[np.newaxis, :, :, :])
 
             boxes = self.detect(score_map=score_map, geo_map=geo_map)
 
+            return self.to_boxes(boxes, ratio_h, ratio_w), 1.0
+        except:
+            print('Error in method {0} in module {1}'.format('scann_measured', 'east_bridge.py'))
+            return None
+
+    def can_split(self, image):
+        """Returns whether scann examines the passed image in a single pass through the model, so that it can be
+        split into forward and decode_maps. Images examined in tiles or in two passes cannot be split.
+
+        :param image:The image to be examined
+        :return:True, if forward and decode_maps give the same boxes as scann.
+        """
+        try:
+            if config.EAST_COARSE_TO_FINE:
+                return False
+
+            return not (config.EAST_TILED and max(image.shape[:2]) > config.EAST_TILE_SIZE)
+        except:
+            print('Error in method {0} in module {1}'.format('can_split', 'east_bridge.py'))
+            return None
+
+    def forward(self, image):
+        """Passes the image through the model without decoding the boxes. Together with decode_maps, this splits
+        scann into its expensive and its cheap part, so that the boxes can be decoded again with other
+        thresholds without another pass through the model (see can_split).
+
+        :param image:The image to be examined
+        :return:The score map, the geo map and the ratios (ratio_h, ratio_w) of the resized image.
+        """
+        try:
+            return self.predict_batch([image])[0]
+        except:
+            print('Error in method {0} in module {1}'.format('forward', 'east_bridge.py'))
+            return None
+
+    def decode_maps(self, score_map, geo_map, ratios):
+        """Decodes the output of forward into boxes in the coordinates of the image.
+
+        :param score_map:The score map
+        :param geo_map:The geo map
+        :param ratios:The ratios (ratio_h, ratio_w) of the resized image
+        :return:A NumPy array of predicted text areas.
+        """
+        try:
+            boxes = self.detect(score_map=score_map, geo_map=geo_map)
+
+            return self.to_boxes(boxes, ratios[0], ratios[1])
+        except:
+            print('Error in method {0} in module {1}'.format('decode_maps', 'east_bridge.py'))
+            return None
+
+    def stage_config(self):
+        """Returns the configuration of the stages of the bridge. If it changes, stored results of the stage
+        are no longer valid.
+
+        :return:A dictionary with the configuration of the stages forward and decode.
+        """
+        try:
+            return {'forward': {'model': config.EAST_MODEL_PATH,
+                                'json': config.EAST_JSON_PATH,
+                                'tiled': config.EAST_TILED,
+                                'tile_size': config.EAST_TILE_SIZE,
+                                'tile_overlap': config.EAST_TILE_OVERLAP,
+                                'coarse_to_fine': config.EAST_COARSE_TO_FINE,
+                                'coarse_side': config.EAST_COARSE_SIDE,
+                                'coarse_score_thresh': config.EAST_COARSE_SCORE_THRESH,
+                                'coarse_padding': config.EAST_COARSE_PADDING},
+                    'decode': {'score_map_thresh': config.EAST_SCORE_MAP_THRESH,
+                               'box_thresh': config.EAST_BOX_THRESH,
+                               'nms_thres': config.EAST_NMS_THRES,
+                               'nms': config.EAST_NMS}}
+        except:
+            print('Error in method {0} in module {1}'.format('stage_config', 'east_bridge.py'))
+            return None
+
+    def scann_batch(self, images):
+        """Examines several images at once. Images of the same size after resizing are passed through the model
+        together (see predict_batch).
+
+        :param images:A list of images (raster images) to be examined.
+        :return:A list with a NumPy array of predicted text areas for each image.
+        """
+        try:
+            results = []
+
+            for score_map, geo_map, (ratio_h, ratio_w) in self.predict_batch(images):
+                boxes = self.detect(score_map=score_map, geo_map=geo_map)
+                results.append(self.to_boxes(boxes, ratio_h, ratio_w))
+
+            return results
+        except:
+            print('Error in method {0} in module {1}'.format('scann_batch', 'east_bridge.py'))
+            return None
+
+    def scann_tiled(self, image, tile_size=None, overlap=None, nms_thres=None):
+        """Examines a very large image in overlapping tiles instead of downscaling it to max_side_len, so that
+        small print is preserved. The tiles are passed through the model in batches of EAST_BATCH_SIZE, so the
+        required memory depends on the tile size and not on the size of the image.
+
+        A box is only taken from the tile whose core contains its center. The cores divide the image at the
+        middle of the overlaps. Remaining duplicates in the overlaps are merged with a standard NMS.
+
+        The summed area of the tiles relative to the area of the image is returned as processed area ratio. It
+        exceeds 1.0, because the tiles overlap and tiles at the edge are filled up.
+
+        :param image:The image to be examined
+        :param tile_size:The edge length of the tiles, a multiple of 32 of at most 2400 (otherwise it is rounded
+        down). Default = EAST_TILE_SIZE.
+        :param overlap:The overlap of neighbouring tiles, less than the tile size. Default = EAST_TILE_OVERLAP.
+        :param nms_thres:Threshold for the nms between the tiles. Default = EAST_NMS_THRES.
+        :return:A NumPy array of predicted text areas and the processed area ratio.
+        """
+        try:
+            if tile_size is None:
+                tile_size = config.EAST_TILE_SIZE
+            if overlap is None:
+                overlap = config.EAST_TILE_OVERLAP
+            if nms_thres is None:
+                nms_thres = config.EAST_NMS_THRES
+
+            # the model requires multiples of 32, larger tiles would be downscaled by predict_batch
+            valid_size = min(max(int(tile_size) // 32 * 32, 32), 2400)
+            if valid_size != tile_size:
+                print('Tile size {0} is not a multiple of 32 up to 2400, {1} is used'.format(tile_size, valid_size))
+                tile_size = valid_size
+
+            overlap = min(max(int(overlap), 0), tile_size - 32)
+
+            h, w = image.shape[:2]
+            rows = self.tile_cores(h, tile_size, overlap)
+            columns = self.tile_cores(w, tile_size, overlap)
+
+            tiles = [(y, x, core_y, core_x) for y, core_y in rows for x, core_x in columns]
+            merged = []
+
+            ratio = len(tiles) * tile_size * tile_size / float(h * w)
+
+            for start in range(0, len(tiles), config.EAST_BATCH_SIZE):
+                chunk = tiles[start:start + config.EAST_BATCH_SIZE]
+                images = [self.get_tile(image, y, x, tile_size) for y, x, core_y, core_x in chunk]
+
+                for (score_map, geo_map, (ratio_h, ratio_w)), (y, x, core_y, core_x) in zip(
+                        self.predict_batch(images), chunk):
+                    boxes = self.detect(score_map=score_map, geo_map=geo_map)
+
+                    if boxes is None:
+                        continue
+
+                    # scale the boxes to the tile and translate them into the coordinates of the image
+                    boxes[:, 0:8:2] = boxes[:, 0:8:2] / ratio_w + x
+                    boxes[:, 1:8:2] = boxes[:, 1:8:2] / ratio_h + y
+
+                    # keep only the boxes whose center lies in the core of the tile
+                    center_x = boxes[:, 0:8:2].mean(axis=1)
+                    center_y = boxes[:, 1:8:2].mean(axis=1)
+                    inside = ((center_x >= core_x[0]) & (center_x < core_x[1]) &
+                              (center_y >= core_y[0]) & (center_y < core_y[1]))
+
+                    merged.append(boxes[inside])
+
+            if len(merged) == 0:
+                return [], ratio
+
+            boxes = np.concatenate(merged)
+
+            if boxes.shape[0] == 0:
+                return [], ratio
+
+            boxes = east_nms.standard_nms(boxes.astype(np.float64), nms_thres).astype(np.float32)
+
+            return self.to_boxes(boxes, 1.0, 1.0), ratio
+        except:
+            print('Error in method {0} in module {1}'.format('scann_tiled', 'east_bridge.py'))
+            return None
+
+    def scann_coarse_to_fine(self, image, coarse_side=None, padding=None, nms_thres=None):
+        """Examines the image in two passes. The first pass runs the model on a copy of the image whose longest
+        side is reduced to coarse_side and finds the regions containing text in its score map (see find_regions).
+        The second pass runs the model on these regions of the original image only. The boxes are translated
+        back into the coordinates of the image and duplicates in overlapping regions are merged.
+
+        The work of both passes is returned as processed area ratio: the pixels passed through the model
+        relative to the pixels of a single pass over the whole image.
+
+        :param image:The image to be examined
+        :param coarse_side:The longest side of the image in the first pass. Default = EAST_COARSE_SIDE.
+        :param padding:The margin added around each region in pixels of the image. Default = EAST_COARSE_PADDING.
+        :param nms_thres:Threshold for the nms between the regions. Default = EAST_NMS_THRES.
+        :return:A NumPy array of predicted text areas and the processed area ratio.
+        """
+        try:
+            if coarse_side is None:
+                coarse_side = config.EAST_COARSE_SIDE
+            if padding is None:
+                padding = config.EAST_COARSE_PADDING
+            if nms_thres is None:
+                nms_thres = config.EAST_NMS_THRES
+
+            h, w = image.shape[:2]
+            full_h, full_w = self.input_size(h, w)
+
+            score_map, geo_map, (ratio_h, ratio_w) = self.predict_batch([image], coarse_side)[0]
+            regions = self.find_regions(score_map[0, :, :, 0], ratio_h, ratio_w, h, w, padding)
+
+            # the score map has a quarter of the size of the input of the model
+            processed = score_map.shape[1] * score_map.shape[2] * 16
+
+            if len(regions) == 0:
+                return [], processed / float(full_h * full_w)
+
+            crops = [image[y0:y1, x0:x1] for x0, y0, x1, y1 in regions]
+            merged = []
+
+            for (score_map, geo_map, (ratio_h, ratio_w)), (x0, y0, x1, y1) in zip(self.predict_batch(crops),
+                                                                                  regions):
+                processed += score_map.shape[1] * score_map.shape[2] * 16
+
+                boxes = self.detect(score_map=score_map, geo_map=geo_map)
+
+                if boxes is None:
+                    continue
+
+                # translate the boxes into the coordinates of the image
+                boxes[:, 0:8:2] = boxes[:, 0:8:2] / ratio_w + x0
+                boxes[:, 1:8:2] = boxes[:, 1:8:2] / ratio_h + y0
+
+                merged.append(boxes)
+
+            ratio = processed / float(full_h * full_w)
+
+            if len(merged) == 0:
+                return [], ratio
+
+            boxes = np.concatenate(merged)
+
+            if len(merged) > 1:
+                boxes = east_nms.standard_nms(boxes.astype(np.float64), nms_thres).astype(np.float32)
+
+            return self.to_boxes(boxes, 1.0, 1.0), ratio
+        except:
+            print('Error in method {0} in module {1}'.format('scann_coarse_to_fine', 'east_bridge.py'))
+            return None
+
+    def find_regions(self, score_map, ratio_h, ratio_w, h, w, padding, score_map_thresh=None):
+        """Finds the regions containing text in the score map of the first pass of scann_coarse_to_fine. The
+        thresholded score map is dilated, so that neighbouring words and lines form one region. The surrounding
+        rectangles of the connected components are scaled to the image, padded, and overlapping rectangles are
+        merged.
+
+        :param score_map:The score map of the first pass (2D)
+        :param ratio_h:The ratio of the resized and the original height in the first pass
+        :param ratio_w:The ratio of the resized and the original width in the first pass
+        :param h:The height of the image
+        :param w:The width of the image
+        :param padding:The margin added around each region in pixels of the image
+        :param score_map_thresh:Threshold for the score map. Default = EAST_COARSE_SCORE_THRESH.
+        :return:A list of regions (x0, y0, x1, y1) in the coordinates of the image.
+        """
+        try:
+            if score_map_thresh is None:
+                score_map_thresh = config.EAST_COARSE_SCORE_THRESH
+
+            mask = (score_map > score_map_thresh).astype(np.uint8)
+            mask = cv2.dilate(mask, np.ones((3, 3), np.uint8))
+
+            count, labels, stats, centroids = cv2.connectedComponentsWithStats(mask)
+
+            # the score map has a quarter of the size of the resized image
+            rects = []
+            for x, y, rect_w, rect_h, area in stats[1:]:
+                x0 = max(int(x * 4 / ratio_w) - padding, 0)
+                y0 = max(int(y * 4 / ratio_h) - padding, 0)
+                x1 = min(int(np.ceil((x + rect_w) * 4 / ratio_w)) + padding, w)
+                y1 = min(int(np.ceil((y + rect_h) * 4 / ratio_h)) + padding, h)
+
+                # the model requires at least 32 pixels per side
+                if x1 - x0 < 32:
+                    x0 = max(min(x0, w - 32), 0)
+                    x1 = min(x0 + 32, w)
+                if y1 - y0 < 32:
+                    y0 = max(min(y0, h - 32), 0)
+                    y1 = min(y0 + 32, h)
+
+                rects.append([x0, y0, x1, y1])
+
+            # merge overlapping regions until no two regions overlap
+            merged = True
+            while merged:
+                merged = False
+                for i in range(len(rects)):
+                    for j in range(i + 1, len(rects)):
+                        a, b = rects[i], rects[j]
+                        if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                            rects[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                            del rects[j]
+                            merged = True
+                            break
+                    if merged:
+                        break
+
+            return [tuple(rect) for rect in rects]
+        except:
+            print('Error in method {0} in module {1}'.format('find_regions', 'east_bridge.py'))
+            return None
+
+    def tile_cores(self, length, tile_size, overlap):
+        """Divides a side of an image into overlapping tiles. The last tile ends at the end of the side. The core
+        of each tile reaches from the middle of the overlap with its predecessor to the middle of the overlap
+        with its successor.
+
+        :param length:The length of the side.
+        :param tile_size:The edge length of the tiles.
+        :param overlap:The minimum overlap of neighbouring tiles.
+        :return:A list of tuples with the start of a tile and its core (from, to).
+        """
+        try:
+            if length <= tile_size:
+                starts = [0]
+            else:
+                step = tile_size - overlap
+                starts = list(range(0, length - tile_size, step)) + [length - tile_size]
+
+            cores = []
+            for i, start in enumerate(starts):
+                core_from = (start + starts[i - 1] + tile_size) / 2.0 if i > 0 else -np.inf
+                core_to = (starts[i + 1] + start + tile_size) / 2.0 if i < len(starts) - 1 else np.inf
+                cores.append((start, (core_from, core_to)))
+
+            return cores
+        except:
+            print('Error in method {0} in module {1}'.format('tile_cores', 'east_bridge.py'))
+            return None
+
+    def get_tile(self, image, y, x, tile_size):
+        """Cuts a tile out of the image. Tiles at the edge of small images are filled up with black, so that
+        all tiles have the same size and can be passed through the model together.
+
+        :param image:The image
+        :param y:The upper edge of the tile
+        :param x:The left edge of the tile
+        :param tile_size:The edge length of the tile
+        :return:The tile
+        """
+        try:
+            tile = image[y:y + tile_size, x:x + tile_size]
+
+            if tile.shape[0] < tile_size or tile.shape[1] < tile_size:
+                tile = np.pad(tile, ((0, tile_size - tile.shape[0]), (0, tile_size - tile.shape[1]), (0, 0)),
+                              mode='constant')
+
+            return tile
+        except:
+            print('Error in method {0} in module {1}'.format('get_tile', 'east_bridge.py'))
+            return None
+
+    def predict_batch(self, images, max_side_len=2400):
+        """Resizes the passed images (see resize_image) and passes all images of the same resulting size through
+        the model together, in batches of at most EAST_BATCH_SIZE images.
+
+        :param images:A list of images (raster images).
+        :param max_side_len:Limit of max image size
+        :return:A list with a tuple (score map, geo map, (ratio_h, ratio_w)) for each image.
+        """
+        try:
+            results = [None] * len(images)
+
+            groups = {}
+            for i, image in enumerate(images):
+                img_resized, ratios = self.resize_image(image, max_side_len)
+                groups.setdefault(img_resized.shape, []).append((i, img_resized, ratios))
+
+            for group in groups.values():
+                for start in range(0, len(group), config.EAST_BATCH_SIZE):
+                    chunk = group[start:start + config.EAST_BATCH_SIZE]
+                    batch = np.stack([(img_resized / 127.5) - 1 for i, img_resized, ratios in chunk])
+
+                    with self.graph.as_default():
+                        score_maps, geo_maps = self.model.predict(batch)
+
+                    for k, (i, img_resized, ratios) in enumerate(chunk):
+                        results[i] = (score_maps[k:k + 1], geo_maps[k:k + 1], ratios)
+
+            return results
+        except:
+            print('Error in method {0} in module {1}'.format('predict_batch', 'east_bridge.py'))
+            return None
+
+    def to_boxes(self, boxes, ratio_h, ratio_w):
+        """External code (add try...except and an extension)
+        Converts the restored boxes into boxes of four points in the coordinates of the original image.
+        Boxes that are too small are discarded.
+
+        :param boxes:The restored boxes (N*9) or None
+        :param ratio_h:The ratio of the resized and the original height
+        :param ratio_w:The ratio of the resized and the original width
+        :return:A list of boxes.
+        """
+        try:
             new_boxes = []
 
             if boxes is not None:
@@ -86,11 +515,11 @@ class EastBridge:
 
             return new_boxes
         except:
-            print('Error in method {0} in module {1}'.format('scann', 'east_bridge.py'))
+            print('Error in method {0} in module {1}'.format('to_boxes', 'east_bridge.py'))
             return None
 
     def resize_image(self, im, max_side_len=2400):
-        """External code (add try...except)
+        """External code (add try...except, the size is calculated by input_size)
         Resize image to a size multiple of 32 which is required by the network
 
         :param im:The resized image
@@ -100,6 +529,27 @@ class EastBridge:
         try:
             h, w, _ = im.shape
 
+            resize_h, resize_w = self.input_size(h, w, max_side_len)
+            im = cv2.resize(im, (int(resize_w), int(resize_h)))
+
+            ratio_h = resize_h / float(h)
+            ratio_w = resize_w / float(w)
+
+            return im, (ratio_h, ratio_w)
+        except:
+            print('Error in method {0} in module {1}'.format('resize_image', 'east_bridge.py'))
+            return None
+
+    def input_size(self, h, w, max_side_len=2400):
+        """External code (add try...except)
+        Calculates the size of an image passed to the network (see resize_image).
+
+        :param h:The height of the image
+        :param w:The width of the image
+        :param max_side_len:Limit of max image size to avoid out of memory in gpu
+        :return:The height and width of the resized image (multiples of 32)
+        """
+        try:
             resize_w = w
             resize_h = h
 
@@ -113,28 +563,31 @@ class EastBridge:
 
             resize_h = resize_h if resize_h % 32 == 0 else (resize_h // 32) * 32
             resize_w = resize_w if resize_w % 32 == 0 else (resize_w // 32) * 32
-            im = cv2.resize(im, (int(resize_w), int(resize_h)))
 
-            ratio_h = resize_h / float(h)
-            ratio_w = resize_w / float(w)
-
-            return im, (ratio_h, ratio_w)
+            return resize_h, resize_w
         except:
-            print('Error in method {0} in module {1}'.format('resize_image', 'east_bridge.py'))
+            print('Error in method {0} in module {1}'.format('input_size', 'east_bridge.py'))
             return None
 
-    def detect(self, score_map, geo_map, score_map_thresh=0.8, box_thresh=0.1, nms_thres=0.2):
-        """External code (add try...except)
+    def detect(self, score_map, geo_map, score_map_thresh=None, box_thresh=None, nms_thres=None):
+        """External code (add try...except and configurable thresholds)
         Restore text boxes from score map and geo map
 
         :param score_map:List of probabilities
         :param geo_map:List of localities
-        :param score_map_thresh:Threshhold for score map
-        :param box_thresh:Threshhold for boxes
-        :param nms_thres:Threshold for nms
+        :param score_map_thresh:Threshhold for score map. Default = EAST_SCORE_MAP_THRESH.
+        :param box_thresh:Threshhold for boxes. Default = EAST_BOX_THRESH.
+        :param nms_thres:Threshold for nms. Default = EAST_NMS_THRES.
         :return:The recognized regions as boxes
         """
         try:
+            if score_map_thresh is None:
+                score_map_thresh = config.EAST_SCORE_MAP_THRESH
+            if box_thresh is None:
+                box_thresh = config.EAST_BOX_THRESH
+            if nms_thres is None:
+                nms_thres = config.EAST_NMS_THRES
+
             if len(score_map.shape) == 4:
                 score_map = score_map[0, :, :, 0]
                 geo_map = geo_map[0, :, :, ]
@@ -153,17 +606,13 @@ class EastBridge:
             boxes[:, :8] = text_box_restored.reshape((-1, 8))
             boxes[:, 8] = score_map[xy_text[:, 0], xy_text[:, 1]]
 
-            # boxes = nms_locality.nms_locality(boxes.astype(np.float64), nms_thres)
-            boxes = east_lanms.merge_quadrangle_n9(boxes.astype('float32'), nms_thres)
+            boxes = self.merge_boxes(boxes, nms_thres)
 
             if boxes.shape[0] == 0:
                 return None
 
             # here we filter some low score boxes by the average score map, this is different from the orginal paper
-            for i, box in enumerate(boxes):
-                mask = np.zeros_like(score_map, dtype=np.uint8)
-                cv2.fillPoly(mask, box[:8].reshape((-1, 4, 2)).astype(np.int32) // 4, 1)
-                boxes[i, 8] = cv2.mean(score_map, mask)[0]
+            boxes[:, 8] = self.box_scores(score_map, boxes)
             boxes = boxes[boxes[:, 8] > box_thresh]
 
             return boxes
@@ -171,6 +620,87 @@ class EastBridge:
             print('Error in method {0} in module {1}'.format('detect', 'east_bridge.py'))
             return None
 
+    def box_scores(self, score_map, boxes):
+        """Calculates the average of the score map inside each box. Each box is only rasterized inside its
+        surrounding rectangle (clipped to the score map), instead of on a mask of the size of the whole map.
+        The result is the same as with a full-size mask, but the effort no longer depends on the size of the map.
+
+        :param score_map:The score map (2D)
+        :param boxes:The boxes (N*9, coordinates in the image, 4 times the size of the score map)
+        :return:The average score for each box, 0 if a box lies outside the score map
+        """
+        try:
+            h, w = score_map.shape[:2]
+            quads = boxes[:, :8].reshape((-1, 4, 2)).astype(np.int32) // 4
+
+            x_min = np.maximum(quads[:, :, 0].min(axis=1), 0)
+            y_min = np.maximum(quads[:, :, 1].min(axis=1), 0)
+            x_max = np.minimum(quads[:, :, 0].max(axis=1), w - 1)
+            y_max = np.minimum(quads[:, :, 1].max(axis=1), h - 1)
+
+            scores = np.zeros(boxes.shape[0], dtype=np.float32)
+
+            for i, quad in enumerate(quads):
+                if x_min[i] > x_max[i] or y_min[i] > y_max[i]:
+                    continue
+
+                mask = np.zeros((y_max[i] - y_min[i] + 1, x_max[i] - x_min[i] + 1), dtype=np.uint8)
+                cv2.fillPoly(mask, (quad - [x_min[i], y_min[i]])[np.newaxis], 1)
+                scores[i] = cv2.mean(score_map[y_min[i]:y_max[i] + 1, x_min[i]:x_max[i] + 1], mask)[0]
+
+            return scores
+        except:
+            print('Error in method {0} in module {1}'.format('box_scores', 'east_bridge.py'))
+            return None
+
+    def merge_boxes(self, boxes, nms_thres):
+        """Merges the restored boxes with the locality aware NMS defined in EAST_NMS. If the C++ implementation
+        (lanms) cannot be built on this machine or is outdated, the NumPy implementation is used instead.
+
+        :param boxes:The restored boxes (N*9, coordinates and score)
+        :param nms_thres:Threshold for nms
+        :return:The merged boxes
+        """
+        try:
+            if self.nms == 'lanms':
+                try:
+                    return east_lanms.merge_quadrangle_n9(boxes.astype('float32'), nms_thres)
+                except (ImportError, RuntimeError, TypeError):
+                    print('lanms not available, numpy is used for nms')
+                    self.nms = 'numpy'
+
+            return east_nms.nms_locality(boxes, nms_thres).astype('float32').reshape((-1, 9))
+        except:
+            print('Error in method {0} in module {1}'.format('merge_boxes', 'east_bridge.py'))
+            return None
+
+    def merge_regions(self, boxes, nms_thres=None):
+        """Merges the boxes found in several overlapping regions of one image with the standard NMS, so that a
+        text found in two regions is kept once. The scores of the boxes are no longer known, so the larger of two
+        overlapping boxes is kept.
+
+        :param boxes:The boxes of all regions in the coordinates of the image (each defined with four points).
+        :param nms_thres:Threshold for the nms between the regions. Default = EAST_NMS_THRES.
+        :return:A list of boxes.
+        """
+        try:
+            if nms_thres is None:
+                nms_thres = config.EAST_NMS_THRES
+
+            if len(boxes) == 0:
+                return []
+
+            quads = np.asarray(boxes, dtype=np.float64).reshape((-1, 4, 2))
+            areas = np.abs(east_nms.signed_area(quads))
+
+            boxes = np.hstack([quads.reshape((-1, 8)), areas[:, np.newaxis]])
+            boxes = east_nms.standard_nms(boxes, nms_thres).astype(np.float32)
+
+            return self.to_boxes(boxes, 1.0, 1.0)
+        except:
+            print('Error in method {0} in module {1}'.format('merge_regions', 'east_bridge.py'))
+            return None
+
     def sort_poly(self, p):
         """External code (add try...except)
         Sorts the polygon
@@ -10,8 +10,6 @@ For a better understanding the documentation has been supplemented in parts. Cod
 taken from the source was marked with "External code".
 """
 
-import time
-
 import cv2
 import numpy as np
 from imutils.object_detection import non_max_suppression
@@ -23,6 +21,13 @@ class EastOpenCvBridge:
     """A bridge class for connecting to a text detector
     """
 
+    LAYER_NAMES = [
+        "feature_fusion/Conv_7/Sigmoid",
+        "feature_fusion/concat_3"]
+    """The two output layers of the model we are interested in -- the first is the output probabilities and
+    the second can be used to derive the bounding box coordinates of text
+    """
+
     def __init__(self):
         """The constructor
         """
@@ -44,115 +49,218 @@ class EastOpenCvBridge:
         :param image:The image to be examined.
         :return:A NumPy array of predicted text areas.
         """
+        try:
+            return self.scann_batch([image])[0]
+        except:
+            print('Error in method {0} in module {1}'.format('scann', 'east_open_cv_bridge.py'))
+            return None
+
+    def stage_config(self):
+        """Returns the configuration of the stages of the bridge. If it changes, stored results of the stage
+        are no longer valid.
+
+        :return:A dictionary with the configuration of the stages forward and decode.
+        """
+        try:
+            return {'forward': {'model': config.EAST_OPENCV_MODEL_PATH,
+                                'resolution': config.EAST_OPENCV_RESOLUTION,
+                                'keep_aspect': config.EAST_OPENCV_KEEP_ASPECT},
+                    'decode': {'nms': config.EAST_OPENCV_NMS}}
+        except:
+            print('Error in method {0} in module {1}'.format('stage_config', 'east_open_cv_bridge.py'))
+            return None
+
+    def scann_batch(self, images):
+        """External code (add try...except and an extension for batches)
+        Examines several images at once. All images with the same input size (see input_size) are combined
+        into one blob and passed through the model in a single forward pass. The outputs are then split up
+        per image.
 
+        :param images:A list of images (raster images) to be examined.
+        :return:A list with a NumPy array of predicted text areas for each image.
+        """
         try:
-            # load the input image and grab the image dimensions
-            self.orig = image.copy()
-            (H, W) = image.shape[:2]
+            results = [None] * len(images)
+
+            # group the images by the input size of the model
+            groups = {}
+            for i, image in enumerate(images):
+                groups.setdefault(self.input_size(image), []).append(i)
+
+            for (newW, newH), indices in groups.items():
+                # resize the images and determine the ratio in change for both the width and height
+                resized = [cv2.resize(images[i], (newW, newH)) for i in indices]
+                ratios = [(images[i].shape[1] / float(newW), images[i].shape[0] / float(newH)) for i in indices]
 
-            # set the new width and height and then determine the ratio in change
-            # for both the width and height, should be multiple of 32
-            (newW, newH) = (320, 320)
-            rW = W / float(newW)
-            rH = H / float(newH)
+                # construct a blob from the images and then perform a forward pass of
+                # the model to obtain the two output layer sets
+                blob = cv2.dnn.blobFromImages(resized, 1.0, (newW, newH),
+                                              (123.68, 116.78, 103.94), swapRB=True, crop=False)
+                self.model.setInput(blob)
+                (scores, geometry) = self.model.forward(self.LAYER_NAMES)
+
+                for k, i in enumerate(indices):
+                    # decode the text regions and suppress weak, overlapping bounding boxes
+                    rects, confidences = self.decode(scores[k:k + 1], geometry[k:k + 1])
+                    boxes = self.suppress(rects, confidences)
+
+                    rW, rH = ratios[k]
+                    results[i] = self.scale_boxes(boxes, rW, rH)
+
+            return results
+        except:
+            print('Error in method {0} in module {1}'.format('scann_batch', 'east_open_cv_bridge.py'))
+            return None
+
+    def input_size(self, image):
+        """Determines the size to which an image is resized for the model. The size is defined by
+        EAST_OPENCV_RESOLUTION (e.g. 320, 640 or 1280). If EAST_OPENCV_KEEP_ASPECT is set, the longest side
+        gets this length and the other side keeps the aspect ratio, otherwise the image becomes square. Both
+        sides are multiples of 32.
+
+        :param image:The image to be examined.
+        :return:The new width and height.
+        """
+        try:
+            resolution = config.EAST_OPENCV_RESOLUTION
+
+            if not config.EAST_OPENCV_KEEP_ASPECT:
+                return resolution, resolution
 
-            # resize the image and grab the new image dimensions
-            image = cv2.resize(image, (newW, newH))
             (H, W) = image.shape[:2]
+            ratio = float(resolution) / max(H, W)
 
-            # define the two output layer names for the EAST detector model that
-            # we are interested -- the first is the output probabilities and the
-            # second can be used to derive the bounding box coordinates of text
-            self.layerNames = [
-                "feature_fusion/Conv_7/Sigmoid",
-                "feature_fusion/concat_3"]
-
-            # construct a blob from the image and then perform a forward pass of
-            # the model to obtain the two output layer sets
-            blob = cv2.dnn.blobFromImage(image, 1.0, (W, H),
-                                         (123.68, 116.78, 103.94), swapRB=True, crop=False)
-            start = time.time()
-            self.model.setInput(blob)
-            (scores, geometry) = self.model.forward(self.layerNames)
-            end = time.time()
-
-            # grab the number of rows and columns from the scores volume, then
-            # initialize our set of bounding box rectangles and corresponding
-            # confidence scores
-            (numRows, numCols) = scores.shape[2:4]
-            rects = []  # stores the bounding box coordiantes for text regions
-            confidences = []  # stores the probability associated with each bounding box region in rects
-
-            # loop over the number of rows
-            for y in range(0, numRows):
-                # extract the scores (probabilities), followed by the geometrical
-                # data used to derive potential bounding box coordinates that
-                # surround text
-                scoresData = scores[0, 0, y]
-                xData0 = geometry[0, 0, y]
-                xData1 = geometry[0, 1, y]
-                xData2 = geometry[0, 2, y]
-                xData3 = geometry[0, 3, y]
-                anglesData = geometry[0, 4, y]
-
-                # loop over the number of columns
-                for x in range(0, numCols):
-                    # if our score does not have sufficient probability, ignore it
-                    if scoresData[x] < 0.5:
-                        continue
-
-                    # compute the offset factor as our resulting feature maps will
-                    # be 4x smaller than the input image
-                    (offsetX, offsetY) = (x * 4.0, y * 4.0)
-
-                    # extract the rotation angle for the prediction and then
-                    # compute the sin and cosine
-                    angle = anglesData[x]
-                    cos = np.cos(angle)
-                    sin = np.sin(angle)
-
-                    # use the geometry volume to derive the width and height of
-                    # the bounding box
-                    h = xData0[x] + xData2[x]
-                    w = xData1[x] + xData3[x]
-
-                    # compute both the starting and ending (x, y)-coordinates for
-                    # the text prediction bounding box
-                    endX = int(offsetX + (cos * xData1[x]) + (sin * xData2[x]))
-                    endY = int(offsetY - (sin * xData1[x]) + (cos * xData2[x]))
-                    startX = int(endX - w)
-                    startY = int(endY - h)
-
-                    # add the bounding box coordinates and probability score to
-                    # our respective lists
-                    rects.append((startX, startY, endX, endY))
-                    confidences.append(scoresData[x])
-
-            # apply non-maxima suppression to suppress weak, overlapping bounding boxes
-            boxes = non_max_suppression(np.array(rects), probs=confidences)
-
-            """
-            Extension to the original code to return a usable format.
-            """
-            newboxes = []
-
-            # loop over the bounding boxes
-            for (startX, startY, endX, endY) in boxes:
-                # scale the bounding box coordinates based on the respective ratios
-                startX = int(startX * rW)
-                startY = int(startY * rH)
-                endX = int(endX * rW)
-                endY = int(endY * rH)
-
-                box = []
-                box.append([startX, startY])
-                box.append([endX, startY])
-                box.append([endX, endY])
-                box.append([startX, endY])
-
-                newboxes.append(box)
-
-            return np.asarray(newboxes)
+            newW = max(32, int(round(W * ratio / 32.0)) * 32)
+            newH = max(32, int(round(H * ratio / 32.0)) * 32)
+
+            return newW, newH
         except:
-            print('Error in method {0} in module {1}'.format('scann', 'east_open_cv_bridge.py'))
+            print('Error in method {0} in module {1}'.format('input_size', 'east_open_cv_bridge.py'))
+            return None
+
+    def scale_boxes(self, boxes, rW, rH):
+        """Extension to the original code to return a usable format.
+        Scales the bounding boxes back to the original image and converts them into boxes of four points.
+
+        :param boxes:The bounding boxes (startX, startY, endX, endY) in the resized image.
+        :param rW:The ratio of the original and the resized width.
+        :param rH:The ratio of the original and the resized height.
+        :return:A NumPy array of boxes, each defined with four points.
+        """
+        try:
+            if len(boxes) == 0:
+                return np.asarray([])
+
+            # scale the bounding box coordinates based on the respective ratios
+            boxes = np.asarray(boxes)
+            startX = (boxes[:, 0] * rW).astype(int)
+            startY = (boxes[:, 1] * rH).astype(int)
+            endX = (boxes[:, 2] * rW).astype(int)
+            endY = (boxes[:, 3] * rH).astype(int)
+
+            return np.stack([np.stack([startX, startY], axis=1),
+                             np.stack([endX, startY], axis=1),
+                             np.stack([endX, endY], axis=1),
+                             np.stack([startX, endY], axis=1)], axis=1)
+        except:
+            print('Error in method {0} in module {1}'.format('scale_boxes', 'east_open_cv_bridge.py'))
+            return None
+
+    def merge_regions(self, boxes):
+        """Extension to the original code for regions of interest.
+        Merges the boxes found in several overlapping regions of one image with the NMS defined in
+        EAST_OPENCV_NMS, so that a text found in two regions is kept once. The probabilities of the boxes are no
+        longer known, so the larger of two overlapping boxes is kept.
+
+        :param boxes:The boxes of all regions in the coordinates of the image (each defined with four points).
+        :return:A NumPy array of boxes, each defined with four points.
+        """
+        try:
+            if len(boxes) == 0:
+                return np.asarray([])
+
+            points = np.asarray(boxes).reshape((-1, 4, 2))
+            rects = np.concatenate([points.min(axis=1), points.max(axis=1)], axis=1)
+            areas = ((rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1])).astype(np.float32)
+
+            return self.scale_boxes(self.suppress(rects, areas), 1.0, 1.0)
+        except:
+            print('Error in method {0} in module {1}'.format('merge_regions', 'east_open_cv_bridge.py'))
+            return None
+
+    def decode(self, scores, geometry, min_confidence=0.5):
+        """External code (add try...except, vectorized)
+        Derives the bounding boxes from the output of the model. All cells of the score map with a sufficient
+        probability are decoded at once instead of one after the other.
+
+        The calculation corresponds exactly to the original loop: the products of the geometry are calculated
+        in float32, the sums with the offsets in float64.
+
+        :param scores:The scores volume of the model.
+        :param geometry:The geometry volume of the model.
+        :param min_confidence:The minimum probability of a cell. Default = 0.5.
+        :return:An array of bounding boxes (startX, startY, endX, endY) and an array of their probabilities.
+        """
+        try:
+            # find all cells whose score has sufficient probability (row by row, as in the original loop)
+            ys, xs = np.nonzero(scores[0, 0] >= min_confidence)
+
+            # extract the geometrical data used to derive the bounding boxes
+            xData0 = geometry[0, 0, ys, xs]
+            xData1 = geometry[0, 1, ys, xs]
+            xData2 = geometry[0, 2, ys, xs]
+            xData3 = geometry[0, 3, ys, xs]
+            anglesData = geometry[0, 4, ys, xs]
+
+            # compute the offset factor as our resulting feature maps will
+            # be 4x smaller than the input image
+            offsetX = xs * 4.0
+            offsetY = ys * 4.0
+
+            # extract the rotation angles and compute the sin and cosine
+            cos = np.cos(anglesData)
+            sin = np.sin(anglesData)
+
+            # use the geometry volume to derive the widths and heights of the bounding boxes
+            h = (xData0 + xData2).astype(np.float64)
+            w = (xData1 + xData3).astype(np.float64)
+
+            # compute both the starting and ending (x, y)-coordinates
+            endX = (offsetX + (cos * xData1) + (sin * xData2)).astype(int)
+            endY = (offsetY - (sin * xData1) + (cos * xData2)).astype(int)
+            startX = (endX - w).astype(int)
+            startY = (endY - h).astype(int)
+
+            rects = np.stack([startX, startY, endX, endY], axis=1)
+            confidences = scores[0, 0, ys, xs]
+
+            return rects, confidences
+        except:
+            print('Error in method {0} in module {1}'.format('decode', 'east_open_cv_bridge.py'))
+            return None
+
+    def suppress(self, rects, confidences, overlap_thresh=0.3):
+        """Applies non-maxima suppression to suppress weak, overlapping bounding boxes. The implementation is
+        defined in EAST_OPENCV_NMS: imutils (original behavior) or opencv (cv2.dnn.NMSBoxes, which compares boxes
+        by their intersection over union and may therefore keep slightly different boxes).
+
+        :param rects:An array of bounding boxes (startX, startY, endX, endY).
+        :param confidences:An array of the probabilities of the bounding boxes.
+        :param overlap_thresh:The overlap above which a box is suppressed. Default = 0.3.
+        :return:The remaining bounding boxes.
+        """
+        try:
+            if config.EAST_OPENCV_NMS == 'opencv':
+                if len(rects) == 0:
+                    return []
+
+                xywh = np.stack([rects[:, 0], rects[:, 1], rects[:, 2] - rects[:, 0], rects[:, 3] - rects[:, 1]],
+                                axis=1)
+                indices = cv2.dnn.NMSBoxes(xywh.tolist(), confidences.tolist(), 0.0, overlap_thresh)
+
+                return rects[np.asarray(indices, dtype=int).reshape(-1)]
+
+            return non_max_suppression(rects, probs=confidences, overlapThresh=overlap_thresh)
+        except:
+            print('Error in method {0} in module {1}'.format('suppress', 'east_open_cv_bridge.py'))
             return None
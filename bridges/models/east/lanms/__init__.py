@@ -1,20 +1,85 @@
 import os
+import subprocess
+import sys
+import sysconfig
+import threading
 
 import numpy as np
 
 BASE_DIR = os.path.dirname(os.path.realpath(__file__))
 
+_nms_impl = None
+_build_lock = threading.Lock()
 
-# if subprocess.call(['make', '-C', BASE_DIR]) != 0:  # return value
-#    raise RuntimeError('Cannot compile lanms: {}'.format(BASE_DIR))
+
+def build():
+    # Compiles the adaptor against the headers of the running interpreter. Can be called at install
+    # time (python -m lanms), otherwise it is called on first use if the adaptor cannot be imported.
+    # An installed pybind11 is preferred, the bundled headers only support older interpreters.
+    if sys.platform == 'win32':
+        return build_setuptools()
+    includes = '-I{} -I{}'.format(sysconfig.get_paths()['include'], sysconfig.get_paths()['platinclude'])
+    try:
+        import pybind11
+        pybind11_includes = '-I{}'.format(pybind11.get_include())
+    except ImportError:
+        pybind11_includes = ''
+    if subprocess.call(['make', '-C', BASE_DIR, 'PYTHON_INCLUDES=' + includes,
+                        'PYBIND11_INCLUDES=' + pybind11_includes]) != 0:  # return value
+        raise RuntimeError('Cannot compile lanms: {}'.format(BASE_DIR))
+
+
+def build_setuptools():
+    # Compiles the adaptor with the compiler setuptools uses for extensions (MSVC on Windows, where there is
+    # no make). The result (e.g. adaptor.cp37-win_amd64.pyd) is written next to this file and not committed,
+    # because it only fits the interpreter it was built for.
+    from setuptools import Distribution, Extension
+    include_dirs = [os.path.join(BASE_DIR, 'include')]
+    try:
+        import pybind11
+        include_dirs.insert(0, pybind11.get_include())
+    except ImportError:
+        pass
+    extra_args = [] if sys.platform == 'win32' else ['-std=c++11', '-O3']
+    extension = Extension('adaptor', sources=[os.path.join(BASE_DIR, 'adaptor.cpp'),
+                                              os.path.join(BASE_DIR, 'include', 'clipper', 'clipper.cpp')],
+                          include_dirs=include_dirs, language='c++', extra_compile_args=extra_args)
+    command = Distribution({'name': 'lanms', 'ext_modules': [extension]}).get_command_obj('build_ext')
+    command.build_lib = BASE_DIR
+    command.build_temp = os.path.join(BASE_DIR, 'build')
+    try:
+        command.ensure_finalized()
+        command.run()
+    except Exception as e:
+        raise RuntimeError('Cannot compile lanms: {} ({})'.format(BASE_DIR, e))
+
+
+def _check(nms_impl):
+    # An adaptor compiled from an older adaptor.cpp takes no precision and would fail on every call. A loaded
+    # extension cannot be replaced within the process, so it is reported as missing and has to be rebuilt.
+    try:
+        nms_impl(np.zeros((0, 9), dtype='float32'), 0.3, 10000)
+    except TypeError:
+        raise ImportError('lanms adaptor is outdated, rebuild it with python -m lanms: {}'.format(BASE_DIR))
+    return nms_impl
+
+
+def _load():
+    global _nms_impl
+    with _build_lock:
+        if _nms_impl is None:
+            try:
+                from .adaptor import merge_quadrangle_n9 as nms_impl
+            except ImportError:
+                build()
+                from .adaptor import merge_quadrangle_n9 as nms_impl
+            _nms_impl = _check(nms_impl)
+    return _nms_impl
 
 
 def merge_quadrangle_n9(polys, thres=0.3, precision=10000):
-    from .adaptor import merge_quadrangle_n9 as nms_impl
+    nms_impl = _nms_impl if _nms_impl is not None else _load()
     if len(polys) == 0:
         return np.array([], dtype='float32')
-    p = polys.copy()
-    p[:, :8] *= precision
-    ret = np.array(nms_impl(p, thres), dtype='float32')
-    ret[:, :8] /= precision
-    return ret
+    # the scaling by precision is done by the adaptor, which also returns a float32 array
+    return nms_impl(polys, thres, precision)
@@ -1,8 +1,11 @@
 import numpy as np
 
-from . import merge_quadrangle_n9
+from . import build, merge_quadrangle_n9
 
 if __name__ == '__main__':
+    # compile the adaptor (e.g. at install time)
+    build()
+
     # unit square with confidence 1
     q = np.array([0, 0, 0, 1, 1, 1, 1, 0, 1], dtype='float32')
 
@@ -10,18 +10,22 @@ namespace py = pybind11;
 
 namespace lanms_adaptor {
 
-	std::vector<std::vector<float>> polys2floats(const std::vector<lanms::Polygon> &polys) {
-		std::vector<std::vector<float>> ret;
+	/**
+	 * Writes the polygons directly into a new n-by-9 float32 numpy array, the
+	 * coordinates are divided by precision.
+	 */
+	py::array_t<float> polys2array(const std::vector<lanms::Polygon> &polys, float precision) {
+		py::array_t<float> ret(std::vector<size_t>{polys.size(), 9});
+		auto rbuf = ret.request();
+		auto out = static_cast<float *>(rbuf.ptr);
 		for (size_t i = 0; i < polys.size(); i ++) {
 			auto &p = polys[i];
 			auto &poly = p.poly;
-			ret.emplace_back(std::vector<float>{
-					float(poly[0].X), float(poly[0].Y),
-					float(poly[1].X), float(poly[1].Y),
-					float(poly[2].X), float(poly[2].Y),
-					float(poly[3].X), float(poly[3].Y),
-					float(p.score),
-					});
+			for (size_t j = 0; j < 4; j ++) {
+				out[i * 9 + j * 2] = float(poly[j].X) / precision;
+				out[i * 9 + j * 2 + 1] = float(poly[j].Y) / precision;
+			}
+			out[i * 9 + 8] = float(p.score);
 		}
 
 		return ret;
@@ -34,28 +38,27 @@ namespace lanms_adaptor {
 	 *		quadrangle, and the last one is the score
 	 * \param iou_threshold two quadrangles with iou score above this threshold
 	 *		will be merged
+	 * \param precision the coordinates are multiplied by this factor before
+	 *		they are converted to integers
 	 *
 	 * \return an n-by-9 numpy array, the merged quadrangles
 	 */
-	std::vector<std::vector<float>> merge_quadrangle_n9(
+	py::array_t<float> merge_quadrangle_n9(
 			py::array_t<float, py::array::c_style | py::array::forcecast> quad_n9,
-			float iou_threshold) {
+			float iou_threshold, float precision) {
 		auto pbuf = quad_n9.request();
 		if (pbuf.ndim != 2 || pbuf.shape[1] != 9)
 			throw std::runtime_error("quadrangles must have a shape of (n, 9)");
 		auto n = pbuf.shape[0];
 		auto ptr = static_cast<float *>(pbuf.ptr);
-		return polys2floats(lanms::merge_quadrangle_n9(ptr, n, iou_threshold));
+		return polys2array(lanms::merge_quadrangle_n9(ptr, n, iou_threshold, precision), precision);
 	}
 
 }
 
-PYBIND11_PLUGIN(adaptor) {
-	py::module m("adaptor", "NMS");
+PYBIND11_MODULE(adaptor, m) {
+	m.doc() = "NMS";
 
 	m.def("merge_quadrangle_n9", &lanms_adaptor::merge_quadrangle_n9,
-			"merge quadrangels");
-
-	return m.ptr();
+			"merge quadrangels", py::arg("quad_n9"), py::arg("iou_threshold"), py::arg("precision") = 1);
 }
-
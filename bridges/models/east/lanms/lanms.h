@@ -196,8 +196,12 @@ namespace lanms {
 		return ret;
 	}
 
+	/**
+	 * \param precision the coordinates are multiplied by this factor before
+	 *		they are converted to integers
+	 */
 	std::vector<Polygon>
-		merge_quadrangle_n9(const float *data, size_t n, float iou_threshold) {
+		merge_quadrangle_n9(const float *data, size_t n, float iou_threshold, float precision = 1) {
 			using cInt = cl::cInt;
 
 			// first pass
@@ -206,10 +210,10 @@ namespace lanms {
 				auto p = data + i * 9;
 				Polygon poly{
 					{
-						{cInt(p[0]), cInt(p[1])},
-						{cInt(p[2]), cInt(p[3])},
-						{cInt(p[4]), cInt(p[5])},
-						{cInt(p[6]), cInt(p[7])},
+						{cInt(p[0] * precision), cInt(p[1] * precision)},
+						{cInt(p[2] * precision), cInt(p[3] * precision)},
+						{cInt(p[4] * precision), cInt(p[5] * precision)},
+						{cInt(p[6] * precision), cInt(p[7] * precision)},
 					},
 					p[8],
 				};
@@ -12,6 +12,89 @@ DATABASE_JSON = 'data/ingrediens.json'
 """Location of the JSON database of ingredients"""
 DATABASE_EXCEL = 'data/ingrediens.xlsx'
 """Optional location of Excel file of ingredients"""
+DATABASE_SNAPSHOT = 'data/ingrediens.snapshot'
+"""Location of the snapshot of the ingredients and their indexes, created from the JSON database (None = no
+snapshot)"""
+DATABASE_BACKEND = 'json'
+"""Storage of the ingredients while scanning: 'json' keeps them in memory, 'sqlite' in the SQLite database
+DATABASE_SQLITE built from the JSON database, which suits large databases and can be shared by processes"""
+DATABASE_SQLITE = 'data/ingrediens.sqlite'
+"""Location of the SQLite database of ingredients, created from the JSON database"""
+DB_WATCH_INTERVAL = 10.0
+"""Interval in seconds in which a scanner checks whether the JSON database changed. A changed database is loaded
+in the background and replaces the current one (None = no reload while the scanner is running)"""
 
 BRIDGES_JSON = 'bridges/bridges.json'
 """Storage location of the JSON for the bridges"""
+BRIDGES_CONFIG = 'bridges/bridges_config.py'
+"""Storage location of the configuration of the bridges"""
+
+PIPELINE_QUEUE_SIZE = 4
+"""Maximum number of images waiting between two stages of the pipeline of the scanner"""
+PIPELINE_DECODE_WORKERS = 2
+"""Number of threads reading the images in the pipeline of the scanner"""
+PIPELINE_OUTPUT_WORKERS = 2
+"""Number of threads annotating and writing the images in the pipeline of the scanner"""
+
+BATCH_WORKERS = None
+"""Number of worker processes of the batch scanner (None = number of CPU cores)"""
+BATCH_INTRA_OP_THREADS = 1
+"""Number of threads TensorFlow may use within one operation in a worker process of the batch scanner"""
+BATCH_INTER_OP_THREADS = 1
+"""Number of threads TensorFlow may use for independent operations in a worker process of the batch scanner"""
+
+ROI_MIN_SIZE = 32
+"""Minimum edge length of a region of interest in pixels (the detector requires 32). Smaller regions are enlarged"""
+
+RESULT_CACHE = False
+"""If True, the scanner caches the results of whole images"""
+RESULT_CACHE_ENTRIES = 1024
+"""Maximum number of results kept in memory by the result cache"""
+RESULT_CACHE_BYTES = 64 * 1024 * 1024
+"""Maximum size of the results kept in memory by the result cache (bytes)"""
+RESULT_CACHE_DIR = None
+"""Optional directory in which the result cache stores the results as well (None = memory only)"""
+
+RECOGNIZER_CACHE = False
+"""If True, the recognizer caches the predicted texts of the drawing files"""
+RECOGNIZER_CACHE_ENTRIES = 100000
+"""Maximum number of texts kept by the cache of the recognizer"""
+RECOGNIZER_CACHE_TOLERANCE = 0
+"""Step of the brightness values (0-255) for the keys of the cache of the recognizer (0 = identical drawing files
+only)"""
+
+STAGE_STORE = False
+"""If True, the scanner stores the intermediate results of every image and only repeats changed stages"""
+STAGE_STORE_DIR = 'stages'
+"""Directory of the intermediate results of the scanner"""
+
+FUZZY_MATCHING = False
+"""If True, texts not found in the ingredients are searched again allowing recognition errors"""
+FUZZY_MAX_DISTANCE = 2
+"""Maximum edit distance between a text and an ingredient for the fuzzy search"""
+FUZZY_MIN_LENGTH = 6
+"""Minimum length of a text for the fuzzy search. Shorter texts are too often within one edit of another
+ingredient (e.g. bold ==> gold). Texts containing digits (E-numbers) are searched regardless of their length,
+because only confusions such as 0/o are corrected in them."""
+FUZZY_CONFUSION_COST = 0.3
+"""Cost of substituting characters often confused by the recognizer (0/o, 1/l/i, 5/s) in the fuzzy search"""
+
+LINE_MATCHING = False
+"""If True, the texts of the boxes of a reading line are also searched together for ingredients, so that
+ingredients split into several boxes or merged with other words in one box are found"""
+LINE_MATCHING_MIN_LENGTH = 4
+"""Minimum length of a search term for the search in reading lines"""
+
+TRUNCATED_LENGTH = 16
+"""Maximum length of the texts of the recognizer. Texts of this length may be cut off and are also compared with
+the beginnings of the ingredients"""
+
+NORMALIZE_CACHE_SIZE = 65536
+"""Number of normalized search strings kept by the ingredients, as the same texts recur on many images"""
+
+SCAN_ARCHIVE = None
+"""Optional path of the archive (JSON Lines) of the texts and boxes of all examined images (None = no archive)"""
+REMATCH_WORKERS = None
+"""Number of worker processes matching the archive with the database again (None = number of CPU cores)"""
+REMATCH_CHUNKSIZE = 256
+"""Number of records of the archive handed to a worker process at once"""
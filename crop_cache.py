@@ -0,0 +1,117 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+import constant as const
+
+
+class CropCache:
+    """A cache for the texts predicted by the recognizer. The same words appear in nearly identical form on many
+    images, e.g. of the same product line. The key of a text is a hash of the drawing file after the
+    preprocessing of the recognizer (e.g. 200x31 in grayscale), so repeated drawing files skip the model.
+
+    With a tolerance of 0, only identical drawing files are found. With a larger tolerance, the drawing file is
+    reduced to a quarter of its size and its brightness is quantized in steps of the tolerance before hashing,
+    so that drawing files differing only by noise share a key.
+
+    The least recently used texts are dropped when the number of texts exceeds the limit.
+    """
+
+    def __init__(self, max_entries=None, tolerance=None):
+        """The constructor.
+
+        :param max_entries:The maximum number of texts kept. Default = RECOGNIZER_CACHE_ENTRIES.
+        :param tolerance:Step of the brightness values (0-255) for the key, 0 for exact keys.
+        Default = RECOGNIZER_CACHE_TOLERANCE.
+        """
+        try:
+            self.max_entries = max_entries if max_entries is not None else const.RECOGNIZER_CACHE_ENTRIES
+            self.tolerance = tolerance if tolerance is not None else const.RECOGNIZER_CACHE_TOLERANCE
+
+            self.entries = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+            self.lock = threading.Lock()
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'crop_cache.py'))
+
+    def key(self, img):
+        """Returns the key of a preprocessed drawing file.
+
+        :param img:The preprocessed drawing file (values from 0 to 1).
+        :return:The key as bytes.
+        """
+        try:
+            img = np.rint(np.asarray(img, dtype=np.float32) * 255).astype(np.uint8)
+
+            if self.tolerance > 0:
+                img = cv2.resize(img, (max(img.shape[1] // 4, 1), max(img.shape[0] // 4, 1)),
+                                 interpolation=cv2.INTER_AREA)
+                img = img // self.tolerance
+
+            img = np.ascontiguousarray(img)
+
+            digest = hashlib.sha1(str(img.shape).encode('utf-8'))
+            digest.update(img.data)
+
+            return digest.digest()
+        except:
+            print('Error in method {0} in module {1}'.format('key', 'crop_cache.py'))
+            return None
+
+    def get(self, key):
+        """Returns the text stored under the passed key.
+
+        :param key:The key of the drawing file.
+        :return:The text, or None if the drawing file is not cached.
+        """
+        try:
+            with self.lock:
+                text = self.entries.get(key)
+
+                if text is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+
+                return text
+        except:
+            print('Error in method {0} in module {1}'.format('get', 'crop_cache.py'))
+            return None
+
+    def put(self, key, text):
+        """Stores the text of a drawing file and drops the least recently used text if the limit is exceeded.
+
+        :param key:The key of the drawing file.
+        :param text:The predicted text.
+        """
+        try:
+            with self.lock:
+                self.entries[key] = text
+                self.entries.move_to_end(key)
+
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        except:
+            print('Error in method {0} in module {1}'.format('put', 'crop_cache.py'))
+
+    def statistics(self):
+        """Returns the number of hits and misses, the hit rate and the number of cached texts.
+
+        :return:A dictionary of values.
+        """
+        try:
+            with self.lock:
+                requests = self.hits + self.misses
+
+                return {'hits': self.hits,
+                        'misses': self.misses,
+                        'hit_rate': self.hits / requests if requests > 0 else 0.0,
+                        'entries': len(self.entries)}
+        except:
+            print('Error in method {0} in module {1}'.format('statistics', 'crop_cache.py'))
+            return None
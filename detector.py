@@ -18,6 +18,9 @@ class Detector:
             module = __import__(module_name)
             my_class = getattr(module, class_name)
 
+            self.module_name = module_name
+            self.class_name = class_name
+
             self.instance = my_class()
         except:
             print('Error in method {0} in module {1}'.format('init', 'detector.py'))
@@ -51,3 +54,115 @@ class Detector:
         except:
             print('Error in method {0} in module {1}'.format('scann', 'detector.py'))
             return None
+
+    def scann_measured(self, image):
+        """Examines the passed image like scann and also returns the share of the work done by the bridge (see
+        scann_measured of the bridge). Bridges without this method always examine the whole image.
+
+        :param image:The image (as np array) to be examined
+        :return:A list of boxes and the processed area ratio (1.0 for a single pass over the whole image, more for
+        overlapping tiles).
+        """
+        try:
+            if hasattr(self.instance, 'scann_measured'):
+                return self.instance.scann_measured(image)
+
+            return self.instance.scann(image), 1.0
+        except:
+            print('Error in method {0} in module {1}'.format('scann_measured', 'detector.py'))
+            return None
+
+    def can_split(self, image=None):
+        """Returns whether the current bridge splits the examination into a pass through the model (forward)
+        and the decoding of the boxes (decode_maps).
+
+        :param image:An optional image. If passed, the bridge may decide that this image cannot be split, e.g.
+        because it is examined in tiles (see can_split of the bridge).
+        :return:True, if the bridge provides the methods forward and decode_maps and can split the image.
+        """
+        try:
+            if not (hasattr(self.instance, 'forward') and hasattr(self.instance, 'decode_maps')):
+                return False
+
+            if image is not None and hasattr(self.instance, 'can_split'):
+                return self.instance.can_split(image)
+
+            return True
+        except:
+            print('Error in method {0} in module {1}'.format('can_split', 'detector.py'))
+            return None
+
+    def merge_regions(self, boxes):
+        """Merges the boxes found in several regions of one image, so that texts found in overlapping regions
+        are kept once (see merge_regions of the bridge). Bridges without this method return the boxes unchanged.
+
+        :param boxes:The boxes of all regions in the coordinates of the image (each defined with four points).
+        :return:A list of boxes (each box defined with four points).
+        """
+        try:
+            if hasattr(self.instance, 'merge_regions'):
+                return self.instance.merge_regions(boxes)
+
+            return boxes
+        except:
+            print('Error in method {0} in module {1}'.format('merge_regions', 'detector.py'))
+            return None
+
+    def forward(self, image):
+        """Passes the image through the model of the current bridge without decoding the boxes (see can_split).
+
+        :param image:The image (as np array) to be examined
+        :return:The raw output of the model (e.g. score map, geo map and ratios).
+        """
+        try:
+            return self.instance.forward(image)
+        except:
+            print('Error in method {0} in module {1}'.format('forward', 'detector.py'))
+            return None
+
+    def decode_maps(self, *output):
+        """Decodes the raw output of forward into boxes.
+
+        :param output:The raw output of forward.
+        :return:A list of boxes (each box defined with four points).
+        """
+        try:
+            return self.instance.decode_maps(*output)
+        except:
+            print('Error in method {0} in module {1}'.format('decode_maps', 'detector.py'))
+            return None
+
+    def stage_config(self):
+        """Returns the configuration of the stages forward and decode, consisting of the bridge and the
+        configuration given by the bridge (if it provides a method stage_config).
+
+        :return:A dictionary with the configuration of the stages forward and decode.
+        """
+        try:
+            config = {}
+            if hasattr(self.instance, 'stage_config'):
+                config = self.instance.stage_config()
+
+            bridge = {'module': self.module_name, 'class': self.class_name}
+
+            return {'forward': dict(bridge, **config.get('forward', {})),
+                    'decode': dict(bridge, **config.get('decode', {}))}
+        except:
+            print('Error in method {0} in module {1}'.format('stage_config', 'detector.py'))
+            return None
+
+    def scann_batch(self, images):
+        """Examines all passed images at once by passing them to the current bridge of the class. If the bridge
+        does not provide a method named scann_batch, the images are examined one after the other.
+
+        :param images:A list of images (as np array) to be examined
+        :return:A list with a list of boxes for each image.
+        """
+        try:
+            if hasattr(self.instance, 'scann_batch'):
+                return self.instance.scann_batch(images)
+
+            return [self.instance.scann(image) for image in images]
+        except:
+            print('Error in method {0} in module {1}'.format('scann_batch', 'detector.py'))
+            return None
@@ -9,6 +9,7 @@ import os
 import shutil
 
 import cv2
+import numpy as np
 
 import constant
 from annotation_constants.eval_annotation_constants import EVAL_ANNOTATION_CONTANTS
@@ -120,6 +121,80 @@ def evaluate_database(keywords, scanner):
         print('Error in method {0} in module {1}'.format('evaluate_database', 'evaluation.py'))
 
 
+def evaluate_fuzzy(keywords, scanner):
+    """Searches the passed misrecognized keywords with the fuzzy search of the database and compares the
+    E-numbers found with the expected ones. Every difference is displayed directly on the console.
+
+    :param keywords:A list with pairs of a misrecognized keyword and the expected E-number
+    :param scanner:An instance of the class Scanner.
+    :return:True, if all keywords evaluate to the expected E-numbers, otherwise False.
+    """
+    try:
+        equal = True
+
+        for term, e_number in keywords:
+            present, id, distance = scanner.db.contains_fuzzy(term)
+            found = scanner.db.get_enumber(id) if present else 'nicht vorhanden'
+
+            if found != e_number:
+                equal = False
+                print(term + ' evaluate to ' + found + ' instead of ' + e_number)
+
+        print('Finished, fuzzy search is ' + ('correct' if equal else 'not correct'))
+        return equal
+    except:
+        print('Error in method {0} in module {1}'.format('evaluate_fuzzy', 'evaluation.py'))
+        return False
+
+
+def evaluate_ctc_decoder(versions, count_from, count_to, zeros, scanner, basedir):
+    """Compares the greedy CTC decoder implemented in NumPy with K.ctc_decode of Keras on the text images of the
+    passed directory. The images are expected in the same form as for evaluate_char. Every difference is
+    displayed directly on the console.
+
+    The routine requires the CRNN bridge as the recognizer.
+
+    :param versions:The available image versions
+    :param count_from:The start range of the numbers for the naming. (inclusive)
+    :param count_to:The end range of the numbers for the naming. (inclusive)
+    :param zeros:Number of leading zeros
+    :param scanner:An instance of the class Scanner.
+    :param basedir:The parent directory to the passed directories (this must exist).
+    :return:True, if both decoders return the same texts for all images, otherwise False.
+    """
+    try:
+        bridge = scanner.recognizer.instance
+        equal = True
+
+        for i in range(count_from, count_to + 1, 1):
+            i_str = str(i).zfill(zeros)
+
+            for name_x in versions:
+                img_name = i_str + name_x
+                img_in = cv2.imread(os.path.join(basedir, img_name))
+
+                if img_in is not None:
+                    img = bridge.preprocess_image(cv2.cvtColor(img_in, cv2.COLOR_BGR2GRAY))
+
+                    with bridge.graph.as_default():
+                        y_pred = bridge.model.predict(img[np.newaxis, :, :, :])
+
+                    text_numpy = bridge.decode(y_pred, decoder='greedy')[0]
+                    text_keras = bridge.decode(y_pred, decoder='keras_greedy')[0]
+
+                    if text_numpy != text_keras:
+                        equal = False
+                        print(img_name + ': ' + text_numpy + ' differs from ' + text_keras)
+                else:
+                    print('Image not readable')
+
+        print('Finished, decoders are ' + ('equal' if equal else 'not equal'))
+        return equal
+    except:
+        print('Error in method {0} in module {1}'.format('evaluate_ctc_decoder', 'evaluation.py'))
+        return False
+
+
 if __name__ == '__main__':
     """Is executed when the file is executed directly. It executes a series of defined actions to evaluate 
     the system on the basis of the stored images.
@@ -156,6 +231,10 @@ if __name__ == '__main__':
                     'Trinatriumcitrat', 'TrinatrIumcitrat',
                     'Gelborange', 'GelbOrange']
 
+        ## A list of misrecognized keywords with the E-numbers the fuzzy search must find
+        fuzzy_keywords = [['e33o', 'E 330'], ['E1o1', 'E 101'], ['e16oe', 'E 160e'], ['Tartrazln', 'E 102'],
+                          ['bold', 'nicht vorhanden']]
+
         scanner = Scanner(refresh_db=True)
         const = constant
 
@@ -167,8 +246,14 @@ if __name__ == '__main__':
         # evaluate_char(versions, 1, 12, 3, scanner, os.path.join(const.EVALUATION_DIR, 'chars'))
         # evaluate_char(versions, 1, 7, 3, scanner, os.path.join(const.EVALUATION_DIR, 'special_chars'))
 
+        ## chars - compare the NumPy CTC decoder with the decoder of Keras
+        # evaluate_ctc_decoder(versions, 1, 12, 3, scanner, os.path.join(const.EVALUATION_DIR, 'chars'))
+
         ## Database - Find specific keywords. The terms can only be evaluated as True, if certain preprocessings
         ## have been done and certain columns have been searched. TRUE must be returned for all search words!
         # evaluate_database(keywords, scanner)
+
+        ## Database - Find misrecognized keywords with the fuzzy search (see FUZZY_MATCHING)
+        # evaluate_fuzzy(fuzzy_keywords, scanner)
     except:
         print('Error in method {0} in module {1}'.format('main', 'evaluation.py'))
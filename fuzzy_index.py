@@ -0,0 +1,178 @@
+import constant as const
+
+CONFUSIONS = {'0': 'o', '1': 'l', 'i': 'l', '5': 's'}
+"""Characters the recognizer often confuses, mapped to a common representative"""
+
+
+class FuzzyIndex:
+    """An index for finding search terms that differ from a token by a few characters, e.g. because of
+    recognition errors (tartrazln ==> tartrazin, curcumln ==> curcumin).
+
+    The index follows the approach of SymSpell: All variants of the search terms with up to max_distance deleted
+    characters are stored. The same variants of a token lead to all search terms within the edit distance,
+    without comparing the token with every search term. Before the variants are formed, characters often
+    confused by the recognizer (0/o, 1/l/i, 5/s) are replaced by a common representative.
+
+    The candidates are compared with a weighted edit distance, in which confusing such characters costs only
+    FUZZY_CONFUSION_COST. Tokens containing digits, such as E-numbers, are only corrected for these confusions,
+    because a different digit means a different additive. Tokens shorter than 8 characters are corrected by at
+    most one edit. Tokens without digits shorter than min_length are not searched at all (e.g. e33o ==> e330 is
+    found, but bold ==> gold is not).
+    """
+
+    def __init__(self, search_items, max_distance=None, min_length=None):
+        """The constructor. Builds the index.
+
+        :param search_items:A dictionary with the search terms as keys and the IDs as values.
+        :param max_distance:The maximum edit distance. Default = FUZZY_MAX_DISTANCE.
+        :param min_length:The minimum length of a token to be searched. Default = FUZZY_MIN_LENGTH.
+        """
+        try:
+            self.max_distance = max_distance if max_distance is not None else const.FUZZY_MAX_DISTANCE
+            self.min_length = min_length if min_length is not None else const.FUZZY_MIN_LENGTH
+            self.search_items = search_items
+
+            self.deletes = {}
+
+            for key in search_items:
+                for variant in self.variants(self.canonical(key), self.max_distance):
+                    self.deletes.setdefault(variant, []).append(key)
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'fuzzy_index.py'))
+
+    def canonical(self, text):
+        """Replaces the characters often confused by the recognizer by their representative.
+
+        :param text:The text
+        :return:The text with the replacements
+        """
+        try:
+            return ''.join([CONFUSIONS.get(c, c) for c in text])
+        except:
+            print('Error in method {0} in module {1}'.format('canonical', 'fuzzy_index.py'))
+            return None
+
+    def variants(self, text, distance):
+        """Returns the text and all variants with up to distance deleted characters.
+
+        :param text:The text
+        :param distance:The maximum number of deleted characters
+        :return:A set of variants
+        """
+        try:
+            variants = {text}
+            current = {text}
+
+            for i in range(distance):
+                current = {variant[:k] + variant[k + 1:] for variant in current for k in range(len(variant))}
+                variants |= current
+
+            return variants
+        except:
+            print('Error in method {0} in module {1}'.format('variants', 'fuzzy_index.py'))
+            return None
+
+    def distance(self, a, b):
+        """Calculates the weighted edit distance (insertions, deletions, substitutions and transpositions of
+        neighbouring characters) between two texts. Substituting characters often confused by the recognizer
+        costs FUZZY_CONFUSION_COST, all other operations cost 1.
+
+        :param a:The first text
+        :param b:The second text
+        :return:The distance
+        """
+        try:
+            previous2 = None
+            previous = [float(j) for j in range(len(b) + 1)]
+
+            for i in range(1, len(a) + 1):
+                row = [float(i)] + [0.0] * len(b)
+
+                for j in range(1, len(b) + 1):
+                    if a[i - 1] == b[j - 1]:
+                        cost = 0.0
+                    elif CONFUSIONS.get(a[i - 1], a[i - 1]) == CONFUSIONS.get(b[j - 1], b[j - 1]):
+                        cost = const.FUZZY_CONFUSION_COST
+                    else:
+                        cost = 1.0
+
+                    row[j] = min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + cost)
+
+                    if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                        row[j] = min(row[j], previous2[j - 2] + 1)
+
+                previous2, previous = previous, row
+
+            return previous[len(b)]
+        except:
+            print('Error in method {0} in module {1}'.format('distance', 'fuzzy_index.py'))
+            return None
+
+    def searchable(self, token):
+        """Checks whether the passed token is long enough for the search. Tokens containing digits are always
+        searched, because they are only corrected for confusions (see limit).
+
+        :param token:The token
+        :return:True if the token is searched, otherwise False.
+        """
+        try:
+            return len(token) >= self.min_length or any(c.isdigit() for c in token)
+        except:
+            print('Error in method {0} in module {1}'.format('searchable', 'fuzzy_index.py'))
+            return False
+
+    def limit(self, token, max_distance=None):
+        """Returns the maximum distance allowed for the passed token (see the documentation of the class).
+
+        :param token:The token
+        :param max_distance:The maximum edit distance. Default = the maximum distance of the index.
+        :return:The maximum distance
+        """
+        try:
+            if max_distance is None or max_distance > self.max_distance:
+                max_distance = self.max_distance
+
+            if any(c.isdigit() for c in token):
+                return 1.0 - 1e-9
+            elif len(token) < 8:
+                return min(max_distance, 1)
+            else:
+                return max_distance
+        except:
+            print('Error in method {0} in module {1}'.format('limit', 'fuzzy_index.py'))
+            return None
+
+    def lookup(self, token, max_distance=None):
+        """Searches the search term closest to the passed token.
+
+        :param token:The token, normalized like the search terms (lowercase, without spaces).
+        :param max_distance:The maximum edit distance. Default = the maximum distance of the index.
+        :return:The search term, its ID and the distance, or None if no search term is close enough.
+        """
+        try:
+            if token in self.search_items:
+                return token, self.search_items[token], 0.0
+
+            if not self.searchable(token):
+                return None
+
+            limit = self.limit(token, max_distance)
+
+            candidates = set()
+            for variant in self.variants(self.canonical(token), int(limit)):
+                candidates.update(self.deletes.get(variant, []))
+
+            best = None
+            for key in candidates:
+                if abs(len(key) - len(token)) > limit:
+                    continue
+
+                distance = self.distance(token, key)
+
+                if distance <= limit and (best is None or (distance, key) < (best[2], best[0])):
+                    best = (key, self.search_items[key], distance)
+
+            return best
+        except:
+            print('Error in method {0} in module {1}'.format('lookup', 'fuzzy_index.py'))
+            return None
@@ -1,6 +1,56 @@
+import functools
+import hashlib
 import json
-
-import pandas as pd
+import os
+import pickle
+import re
+import threading
+
+import openpyxl
+
+import constant as const
+from aho_corasick import AhoCorasick
+from fuzzy_index import FuzzyIndex
+from ingredient_record import IngredientRecord
+from prefix_trie import PrefixTrie
+
+UMLAUTS = str.maketrans({'ä': 'a', 'ö': 'o', 'ü': 'u'})
+"""Translation table replacing the umlauts"""
+WITHOUT_SPACES = str.maketrans({' ': None})
+"""Translation table removing all spaces"""
+WITHOUT_SPACES_AND_UMLAUTS = str.maketrans({' ': None, 'ä': 'a', 'ö': 'o', 'ü': 'u'})
+"""Translation table removing all spaces and replacing the umlauts"""
+E_NUMBER = re.compile(r'e-*(\d{3,4})-*([a-z]?)')
+"""Pattern of an E-number after removing the spaces (e.g. e-160e for E - 160 e)"""
+SNAPSHOT_FORMAT = 2
+"""Format of the snapshot of the ingredients, to be increased whenever the stored indexes change"""
+EXCEL_COLUMNS = 7
+"""Number of columns of the Excel file (ID, E-Nr, ingrediens, remark, annotation, classification, keywords)"""
+
+
+@functools.lru_cache(maxsize=const.NORMALIZE_CACHE_SIZE)
+def normalize_token(item, usePatch):
+    """Converts a search string into the form of the search terms. The string is converted to lowercase letters
+    and all spaces are removed. If usePatch is set, the umlauts are replaced. E-numbers are written without
+    hyphens (E - 160 e ==> e160e).
+
+    The results are cached, because the same texts recur on many images.
+
+    :param item:The search string
+    :param usePatch:If true, umlauts are replaced by a, o and u
+    :return:The normalized search string
+    """
+    try:
+        item = item.lower().translate(WITHOUT_SPACES_AND_UMLAUTS if usePatch == True else WITHOUT_SPACES)
+
+        e_number = E_NUMBER.fullmatch(item)
+        if e_number is not None:
+            item = 'e' + e_number.group(1) + e_number.group(2)
+
+        return item
+    except:
+        print('Error in method {0} in module {1}'.format('normalize_token', 'ingrediens.py'))
+        return None
 
 
 class Ingredients():
@@ -14,80 +64,309 @@ class Ingredients():
 
     The static convert method can be used to convert an Excel file corresponding to the requirements
     into a JSON file. Requirements are: Sheet 1, start at A1 (header): ID, E-Nr, ingrediens (comma separated),
-    remark, annotation, classification, keywords (comma separated)
+    remark, annotation, classification, keywords (comma separated). The JSON file keeps a fingerprint of the
+    Excel file, so an unchanged Excel file is not converted again.
+
+    An ingredient is stored as an instance of the class IngredientRecord with the properties specified here:
+    ingredient_new = [id, e_number, ingrediens_list, remark, annotation, classification, keywords_list]
+
+    Besides the search terms, the ingredients are indexed by their ID and their E-number.
 
-    An ingredient represents a list with the properties specified here:
-    ingredient_new = [id, e_number, ingrediens_list, remark, annotation, classification, keywords_list]"""
+    Building the indexes takes time, especially for large databases. Therefore the instance method stores the
+    ingredients together with all indexes in a snapshot (DATABASE_SNAPSHOT). As long as the JSON file does not
+    change, the snapshot is loaded instead."""
 
-    def __init__(self, items=[], usePatch=True):
+    def __init__(self, items=None, usePatch=True):
         """The constructor. A list of ingredients can be passed as an optional argument.
         ingredient_new = [id, e_number, ingrediens_list, remark, annotation, classification, keywords_list].
 
-        :param items:An optional list of items to add.
+        :param items:An optional list of items (lists or instances of IngredientRecord) to add.
         :param usePatch:If true, special characters contained in search words are converted to normal
         letters (e.g. ö -> o)
         """
         try:
             self.usePatch = usePatch
-            self.items = items
+            self.items = []
+            self.ids = {}
+            self.e_numbers = {}
             self.search_items = {}
+            self.fuzzy_index = None
+            self.automaton = None
+            self.prefix_trie = None
+            self.version = None
+
+            if items is not None:
+                for item in items:
+                    self.add(item)
         except:
             print('Error in method {0} in module {1}'.format('init', 'ingrediens.py'))
 
     @staticmethod
-    def instance(json_path, usePatch=True):
+    def instance(json_path, usePatch=True, snapshot_path=None):
         """Returns a new instance of the Ingrediens class based on the JSON file named in json_path.
 
+        If a snapshot created from the same content of the JSON file exists, it is loaded instead. Otherwise the
+        snapshot is created.
+
         :param json_path:The path to the Json file that serves as the database.
         :param usePatch:If true, special characters contained in search words are converted to normal
         letters (e.g. ö -> o).
+        :param snapshot_path:The path of the snapshot. Default = DATABASE_SNAPSHOT.
         :return:An instance of the class Ingridiens.
         """
         try:
-            with open(json_path, mode='r', encoding='utf-8') as json_file:
-                json_data = json.load(json_file)
-                ingrediens = Ingredients(json_data['items'], usePatch)
-                ingrediens.update()
+            if snapshot_path is None:
+                snapshot_path = const.DATABASE_SNAPSHOT
+
+            with open(json_path, mode='rb') as json_file:
+                content = json_file.read()
+
+            header = Ingredients.snapshot_header(content, usePatch)
+
+            if snapshot_path is not None:
+                ingrediens = Ingredients.load_snapshot(snapshot_path, header)
+
+                if ingrediens is not None:
+                    return ingrediens
+
+            json_data = json.loads(content.decode('utf-8'))
+            ingrediens = Ingredients(json_data['items'], usePatch)
+            ingrediens.update()
+
+            if snapshot_path is not None:
+                if const.FUZZY_MATCHING:
+                    ingrediens.fuzzy_index = FuzzyIndex(ingrediens.search_items)
+
+                ingrediens.save_snapshot(snapshot_path, header)
 
             return ingrediens
         except:
             print('Error in method {0} in module {1}'.format('instance', 'ingrediens.py'))
             return None
 
+    @staticmethod
+    def snapshot_header(content, usePatch):
+        """Returns the header of a snapshot. A snapshot is only valid if its header equals the header of the
+        current JSON file, i.e. the content, the format and the settings affecting the indexes are the same.
+
+        :param content:The content of the JSON file (bytes).
+        :param usePatch:If true, special characters contained in search words are converted to normal letters.
+        :return:The header (a dictionary).
+        """
+        try:
+            return {'format': SNAPSHOT_FORMAT,
+                    'source': hashlib.sha1(content).hexdigest(),
+                    'usePatch': usePatch,
+                    'line_matching_min_length': const.LINE_MATCHING_MIN_LENGTH,
+                    'fuzzy_max_distance': const.FUZZY_MAX_DISTANCE,
+                    'fuzzy_min_length': const.FUZZY_MIN_LENGTH}
+        except:
+            print('Error in method {0} in module {1}'.format('snapshot_header', 'ingrediens.py'))
+            return None
+
+    @staticmethod
+    def load_snapshot(snapshot_path, header):
+        """Loads the ingredients and their indexes from a snapshot.
+
+        :param snapshot_path:The path of the snapshot.
+        :param header:The expected header (see snapshot_header).
+        :return:An instance of the class Ingredients, or None if the snapshot does not exist or is outdated.
+        """
+        try:
+            if not os.path.isfile(snapshot_path):
+                return None
+
+            with open(snapshot_path, mode='rb') as snapshot_file:
+                # The header is read first, so an outdated snapshot is not loaded completely
+                if pickle.load(snapshot_file) != header:
+                    return None
+
+                return pickle.load(snapshot_file)
+        except:
+            print('Error in method {0} in module {1}'.format('load_snapshot', 'ingrediens.py'))
+            return None
+
+    def save_snapshot(self, snapshot_path, header):
+        """Stores the ingredients and their indexes in a snapshot.
+
+        :param snapshot_path:The path of the snapshot.
+        :param header:The header of the snapshot (see snapshot_header).
+        """
+        try:
+            # Write to a temporary file first, so that other processes never read a half written snapshot
+            temp_path = snapshot_path + '.' + str(os.getpid()) + '.' + str(threading.get_ident())
+
+            with open(temp_path, mode='wb') as snapshot_file:
+                pickle.dump(header, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(self, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temp_path, snapshot_path)
+        except:
+            print('Error in method {0} in module {1}'.format('save_snapshot', 'ingrediens.py'))
+
     @staticmethod
     def convert(excel_path, json_path):
         """A static method which converts an Excel file specified in excel_path to the JSON file defined by json_path.
 
+        If the JSON file was created from the same Excel file (same fingerprint), nothing is done. Otherwise the
+        rows are compared with the ingredients of the JSON file by their ID. Only new, changed and deleted
+        ingredients are applied to the stored ingredients, the others are taken over unchanged.
+
         :param excel_path:The excel path.
         :param json_path:The json path.
+        :return:The number of new, changed and deleted ingredients.
         """
         try:
-            raw = pd.read_excel(excel_path)
-            ingrediens_data = Ingredients()
+            fingerprint = Ingredients.fingerprint(excel_path)
+
+            json_data = None
+            if os.path.isfile(json_path):
+                with open(json_path, mode='r', encoding='utf-8') as json_file:
+                    json_data = json.load(json_file)
+
+            if json_data is not None and json_data.get('source') == fingerprint:
+                return 0, 0, 0
+
+            ingrediens_data = Ingredients(json_data['items'] if json_data is not None else None)
+            stored = {item.id: item.to_list() for item in ingrediens_data.items}
+
+            changed = []
+            present = set()
+
+            for ingredient_new in Ingredients.read_excel(excel_path):
+                present.add(ingredient_new[0])
 
-            for x in raw.values:
-                id = x[0]
-                e_number = str(x[1]).strip()
+                if stored.get(ingredient_new[0]) != ingredient_new:
+                    changed.append(ingredient_new)
 
-                ingrediens = str(x[2]).split(',')
-                ingrediens_list = [x.strip() for x in ingrediens]
+            deleted = [id for id in stored if id not in present]
+            inserted = len([x for x in changed if x[0] not in stored])
 
-                remark = str(x[3])
-                annotation = str(x[4])
-                classification = str(x[5])
+            ingrediens_data.apply(changed, deleted)
 
-                keywords = str(x[6]).split(',')
-                keywords_list = [x.strip() for x in keywords]
+            json_data = {'source': fingerprint,
+                         'usePatch': ingrediens_data.usePatch,
+                         'items': [item.to_list() for item in ingrediens_data.items],
+                         'search_items': ingrediens_data.search_items}
 
-                ingredient_new = [id, e_number, ingrediens_list, remark, annotation, classification, keywords_list]
-                ingrediens_data.add(ingredient_new)
+            # Write to a temporary file first, so that a running scanner never reads a half written database
+            temp_path = json_path + '.' + str(os.getpid())
 
-            ingrediens_data.update()
+            with open(temp_path, mode='w', encoding='utf-8') as json_file:
+                json.dump(json_data, json_file, ensure_ascii=False)
 
-            with open(json_path, mode='w', encoding='utf-8') as json_file:
-                json.dump(ingrediens_data.__dict__, json_file, ensure_ascii=False)
+            os.replace(temp_path, json_path)
+
+            return inserted, len(changed) - inserted, len(deleted)
         except:
             print('Error in method {0} in module {1}'.format('convert', 'ingrediens.py'))
+            return None
+
+    @staticmethod
+    def fingerprint(excel_path):
+        """Returns a fingerprint of the Excel file, which changes whenever the file changes.
+
+        :param excel_path:The excel path.
+        :return:The SHA-1 hash of the file (hex string).
+        """
+        try:
+            sha1 = hashlib.sha1()
+
+            with open(excel_path, mode='rb') as excel_file:
+                for chunk in iter(lambda: excel_file.read(1 << 20), b''):
+                    sha1.update(chunk)
+
+            return sha1.hexdigest()
+        except:
+            print('Error in method {0} in module {1}'.format('fingerprint', 'ingrediens.py'))
+            return None
+
+    @staticmethod
+    def read_excel(excel_path):
+        """Reads the ingredients from sheet 1 of the Excel file row by row. The workbook is opened read-only, so
+        the rows are streamed instead of loading the whole sheet. Rows without ID are skipped.
+
+        :param excel_path:The excel path.
+        :return:A generator of ingredients as lists
+        [id, e_number, ingrediens_list, remark, annotation, classification, keywords_list].
+        """
+        workbook = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+
+        try:
+            for row in workbook.worksheets[0].iter_rows(min_row=2, max_col=EXCEL_COLUMNS, values_only=True):
+                if Ingredients.cell_text(row[0]) != 'nan':
+                    yield Ingredients.parse_row(row)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def parse_row(row):
+        """Converts a row of the Excel file into an ingredient.
+
+        :param row:The values of the cells (ID, E-Nr, ingrediens, remark, annotation, classification, keywords).
+        :return:The ingredient [id, e_number, ingrediens_list, remark, annotation, classification, keywords_list].
+        """
+        try:
+            id = int(row[0])
+            e_number = Ingredients.cell_text(row[1]).strip()
+
+            ingrediens = Ingredients.cell_text(row[2]).split(',')
+            ingrediens_list = [x.strip() for x in ingrediens]
+
+            remark = Ingredients.cell_text(row[3])
+            annotation = Ingredients.cell_text(row[4])
+            classification = Ingredients.cell_text(row[5])
+
+            keywords = Ingredients.cell_text(row[6]).split(',')
+            keywords_list = [x.strip() for x in keywords]
+
+            return [id, e_number, ingrediens_list, remark, annotation, classification, keywords_list]
+        except:
+            print('Error in method {0} in module {1}'.format('parse_row', 'ingrediens.py'))
+            return None
+
+    @staticmethod
+    def cell_text(value):
+        """Returns the text of a cell. Empty cells are returned as 'nan', as in the existing JSON files.
+
+        :param value:The value of the cell.
+        :return:The text.
+        """
+        try:
+            if value is None or str(value).strip() == '':
+                return 'nan'
+
+            return str(value)
+        except:
+            print('Error in method {0} in module {1}'.format('cell_text', 'ingrediens.py'))
+            return None
+
+    def apply(self, changed, deleted):
+        """Applies changes to the ingredients and rebuilds the indexes. Changed ingredients replace the
+        ingredients with the same ID at their position, new ingredients are appended.
+
+        :param changed:A list of new or changed ingredients (lists or instances of IngredientRecord).
+        :param deleted:A list of IDs of deleted ingredients.
+        """
+        try:
+            positions = {item.id: i for i, item in enumerate(self.items)}
+
+            for item in changed:
+                record = IngredientRecord.create(item)
+
+                if record.id in positions:
+                    self.items[positions[record.id]] = record
+                else:
+                    positions[record.id] = len(self.items)
+                    self.items.append(record)
+
+            deleted = set(deleted)
+            if len(deleted) > 0:
+                self.items = [item for item in self.items if item.id not in deleted]
+
+            self.update()
+        except:
+            print('Error in method {0} in module {1}'.format('apply', 'ingrediens.py'))
 
     def __iter__(self):
         """Returns an iterator for the list of ingredients.
@@ -116,10 +395,13 @@ class Ingredients():
         """Adds a new ingredient to the list of ingredients.
         ingredient_new = [id, e_number, ingrediens_list, remark, annotation, classification, keywords_list].
 
-        :param item:The element to be added.
+        :param item:The element (list or instance of IngredientRecord) to be added.
         """
         try:
-            self.items.append(item)
+            record = IngredientRecord.create(item)
+
+            self.items.append(record)
+            self.ids[record.id] = record
         except:
             print('Error in method {0} in module {1}'.format('add', 'ingrediens.py'))
 
@@ -133,11 +415,7 @@ class Ingredients():
         :return:True and the ID if exists, otherwise False.
         """
         try:
-            item = item.lower()
-            item = str(item).replace(' ', '')
-
-            if self.usePatch == True:
-                item = self.replaceChar(item)
+            item = self.normalize(item)
 
             if item in self.search_items:
                 id = self.search_items[item]
@@ -148,6 +426,96 @@ class Ingredients():
             print('Error in method {0} in module {1}'.format('contains', 'ingrediens.py'))
             return None
 
+    def contains_fuzzy(self, item, max_distance=None):
+        """Like contains, but also finds ingredients whose search term differs from the passed item by a few
+        characters, e.g. because of recognition errors (see FuzzyIndex). The index is built on the first call.
+
+        :param item:The element (searchstring) for which a check is to be made.
+        :param max_distance:The maximum edit distance. Default = FUZZY_MAX_DISTANCE.
+        :return:True, the ID and the distance if exists, otherwise False, -1 and None.
+        """
+        try:
+            if self.fuzzy_index is None:
+                self.fuzzy_index = FuzzyIndex(self.search_items)
+
+            found = self.fuzzy_index.lookup(self.normalize(item), max_distance)
+
+            if found is not None:
+                return True, found[1], found[2]
+            else:
+                return False, -1, None
+        except:
+            print('Error in method {0} in module {1}'.format('contains_fuzzy', 'ingrediens.py'))
+            return None
+
+    def contains_prefix(self, item):
+        """Checks whether the passed item is the beginning of the search terms of exactly one ingredient. This
+        identifies words cut off by the recognizer (see TRUNCATED_LENGTH).
+
+        :param item:The element (searchstring) for which a check is to be made.
+        :return:True, the ID and the number of ingredients (1) if unique, otherwise False, -1 and the number of
+        ingredients beginning with the item.
+        """
+        try:
+            count, id = self.prefix_trie.lookup(self.normalize(item))
+
+            if count == 1:
+                return True, id, count
+            else:
+                return False, -1, count
+        except:
+            print('Error in method {0} in module {1}'.format('contains_prefix', 'ingrediens.py'))
+            return None
+
+    def contains_many(self, items):
+        """Checks all passed items at once, e.g. all texts of an image. Returns for each item whether it could be
+        assigned to a substance, and if so, the ID, the E-number and the (first) name of the substance.
+
+        :param items:A list of elements (searchstrings) for which a check is to be made.
+        :return:A list of tuples (True, id, e_number, name) if exists, otherwise (False, -1, None, None).
+        """
+        try:
+            results = []
+
+            for item in items:
+                id = self.search_items.get(self.normalize(item)) if item is not None else None
+                record = self.ids.get(id) if id is not None else None
+
+                if record is not None:
+                    results.append((True, id, record.e_number, record.names[0]))
+                else:
+                    results.append((False, -1, None, None))
+
+            return results
+        except:
+            print('Error in method {0} in module {1}'.format('contains_many', 'ingrediens.py'))
+            return None
+
+    def find_all(self, text):
+        """Finds all search terms contained in the passed text, e.g. the concatenated texts of a reading line.
+        The text is searched in a single pass (see AhoCorasick).
+
+        :param text:The text, normalized like the search terms (see normalize).
+        :return:A list of occurrences (start, end, id), where text[start:end] is the search term.
+        """
+        try:
+            return self.automaton.search(text)
+        except:
+            print('Error in method {0} in module {1}'.format('find_all', 'ingrediens.py'))
+            return None
+
+    def normalize(self, item):
+        """Converts a search string into the form of the search terms (see normalize_token).
+
+        :param item:The search string
+        :return:The normalized search string
+        """
+        try:
+            return normalize_token(str(item), self.usePatch)
+        except:
+            print('Error in method {0} in module {1}'.format('normalize', 'ingrediens.py'))
+            return None
+
     def replaceChar(self, item):
         """Replaces the special characters ü, ö, ä with u, o, a
 
@@ -155,11 +523,7 @@ class Ingredients():
         :return:The item with the replacements
         """
         try:
-            str(item).replace("ö", "o")
-            str(item).replace("ä", "a")
-            str(item).replace("ü", "u")
-
-            return item
+            return str(item).translate(UMLAUTS)
         except:
             print('Error in method {0} in module {1}'.format('replaceChar', 'ingrediens.py'))
             return None
@@ -174,7 +538,7 @@ class Ingredients():
             search_list = ["ä", "ö", "ü"]
 
             for x in search_list:
-                if item.find(x):
+                if x in item:
                     return True
 
             return False
@@ -187,15 +551,54 @@ class Ingredients():
         ingredient_new = [id, e_number, ingrediens_list, remark, annotation, classification, keywords_list].
 
         :param id:The ID for which an element is to be returned.
-        :return:The associated element.
+        :return:A list with the associated element, empty if the ID does not exist.
         """
         try:
-            x = [x for x in self.items if x[0] == id]
-            return x
+            record = self.ids.get(id)
+
+            return [record] if record is not None else []
         except:
             print('Error in method {0} in module {1}'.format('get_item', 'ingrediens.py'))
             return None
 
+    def get_record(self, id):
+        """Returns an ingredient based on the ID of the substance.
+
+        :param id:The ID for which an element is to be returned.
+        :return:The associated instance of IngredientRecord or None.
+        """
+        try:
+            return self.ids.get(id)
+        except:
+            print('Error in method {0} in module {1}'.format('get_record', 'ingrediens.py'))
+            return None
+
+    def get_by_enumber(self, e_number):
+        """Returns an ingredient based on its E-number. Case, spaces and hyphens are ignored (E 161 b = e161b).
+
+        :param e_number:The E-number for which an element is to be returned.
+        :return:The associated instance of IngredientRecord or None.
+        """
+        try:
+            return self.e_numbers.get(self.normalize_enumber(e_number))
+        except:
+            print('Error in method {0} in module {1}'.format('get_by_enumber', 'ingrediens.py'))
+            return None
+
+    def normalize_enumber(self, e_number):
+        """Converts an E-number into the form used by the index (e.g. E 161 b ==> e161b).
+
+        :param e_number:The E-number
+        :return:The normalized E-number
+        """
+        try:
+            e_number = str(e_number).lower().replace(' ', '').replace('-', '')
+
+            return e_number if e_number.startswith('e') else 'e' + e_number
+        except:
+            print('Error in method {0} in module {1}'.format('normalize_enumber', 'ingrediens.py'))
+            return None
+
     def get_enumber(self, id):
         """Returns the name of an ingredient based on the ID of the substance.
 
@@ -203,7 +606,7 @@ class Ingredients():
         :return:The corresponding E-number.
         """
         try:
-            return self.get_item(id)[0][1]
+            return self.ids[id].e_number
         except:
             print('Error in method {0} in module {1}'.format('get_enumber', 'ingrediens.py'))
             return None
@@ -215,7 +618,7 @@ class Ingredients():
         :return:The corresponding name.
         """
         try:
-            return self.get_item(id)[0][2]
+            return self.ids[id].names
         except:
             print('Error in method {0} in module {1}'.format('get_name', 'ingrediens.py'))
             return None
@@ -227,7 +630,7 @@ class Ingredients():
         :return:The corresponding remark.
         """
         try:
-            return self.get_item(id)[0][3]
+            return self.ids[id].remark
         except:
             print('Error in method {0} in module {1}'.format('get_remark', 'ingrediens.py'))
             return None
@@ -242,31 +645,76 @@ class Ingredients():
 
         Preprocessing converts the matching strings to lowercase letters and removes all blanks during the
         search.
+
+        The indexes of the IDs and E-numbers, the automaton for searching texts (see find_all) and the trie for
+        searching beginnings (see contains_prefix) are rebuilt as well.
+
+        The version of the database is set to a hash of the ingredients. It changes whenever the content changes.
         """
         try:
-            x = [x for x in self.items]
+            self.version = self.items_version()
+
+            self.ids = {}
+            self.e_numbers = {}
+            self.search_items = {}
+            self.fuzzy_index = None
 
             for x in self.items:
-                # E-numbers can have attached letters. These must be retained.
-                e_number = str(x[1]).lower().strip()
+                self.ids[x.id] = x
+                self.e_numbers[self.normalize_enumber(x.e_number)] = x
+
+                for insert_string in self.search_terms(x):
+                    self.search_items.update({insert_string: x[0]})
+
+            self.automaton = AhoCorasick(self.search_items, const.LINE_MATCHING_MIN_LENGTH)
+            self.prefix_trie = PrefixTrie(self.search_items)
+        except:
+            print('Error in method {0} in module {1}'.format('update', 'ingrediens.py'))
+
+    def search_terms(self, x):
+        """Returns the search terms of an ingredient (see update). Empty cells of the Excel file (stored as
+        'nan') and empty names are left out, they are no search terms.
+
+        :param x:The ingredient (instance of IngredientRecord).
+        :return:A list of search terms.
+        """
+        try:
+            terms = []
+
+            # E-numbers can have attached letters. These must be retained.
+            e_number = str(x[1]).lower().strip()
+
+            if e_number not in ('', 'nan'):
                 e_number = e_number[0].replace('e', '') + e_number[1:]
                 e_number = e_number.strip()
 
-                self.search_items.update({'e' + e_number: x[0]})
-                self.search_items.update({'e-' + e_number: x[0]})
+                terms += ['e' + e_number, 'e-' + e_number]
 
-                for y in x[2]:
-                    insert_string = str(y).strip().lower().replace(' ', '')
-                    self.search_items.update({insert_string: x[0]})
+            for y in x[2] + x[6]:
+                insert_string = str(y).strip().lower().replace(' ', '')
+
+                if insert_string in ('', 'nan'):
+                    continue
 
-                    if self.replaceChar_in_String(insert_string) == True:
-                        self.search_items.update({self.replaceChar(insert_string): x[0]})
+                terms.append(insert_string)
 
-                for y in x[6]:
-                    insert_srting = str(y).strip().lower().replace(' ', '')
-                    self.search_items.update({insert_srting: x[0]})
+                if self.replaceChar_in_String(insert_string) == True:
+                    terms.append(self.replaceChar(insert_string))
 
-                    if self.replaceChar_in_String(insert_string) == True:
-                        self.search_items.update({self.replaceChar(insert_string): x[0]})
+            return terms
         except:
-            print('Error in method {0} in module {1}'.format('update', 'ingrediens.py'))
+            print('Error in method {0} in module {1}'.format('search_terms', 'ingrediens.py'))
+            return None
+
+    def items_version(self):
+        """Returns a hash of the ingredients, which changes whenever the content changes.
+
+        :return:The hash (hex string).
+        """
+        try:
+            content = json.dumps([[x.to_list() for x in self.items], self.usePatch], ensure_ascii=False, default=str)
+
+            return hashlib.sha1(content.encode('utf-8')).hexdigest()
+        except:
+            print('Error in method {0} in module {1}'.format('items_version', 'ingrediens.py'))
+            return None
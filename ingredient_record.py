@@ -0,0 +1,83 @@
+class IngredientRecord:
+    """Represents an ingredient of the database. The properties are kept in slots instead of a list, which needs
+    less memory and allows access by name.
+
+    For compatibility with the former representation as list
+    ingredient = [id, e_number, ingrediens_list, remark, annotation, classification, keywords_list]
+    the properties can also be accessed by their index, e.g. record[1] is the E-number.
+    """
+
+    __slots__ = ('id', 'e_number', 'names', 'remark', 'annotation', 'classification', 'keywords')
+
+    def __init__(self, id, e_number, names, remark, annotation, classification, keywords):
+        """The constructor.
+
+        :param id:The ID of the ingredient.
+        :param e_number:The E-number (e.g. E 100).
+        :param names:A list of names of the ingredient.
+        :param remark:A remark.
+        :param annotation:An annotation.
+        :param classification:A classification.
+        :param keywords:A list of further keywords.
+        """
+        try:
+            self.id = id
+            self.e_number = e_number
+            self.names = names
+            self.remark = remark
+            self.annotation = annotation
+            self.classification = classification
+            self.keywords = keywords
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'ingredient_record.py'))
+
+    @staticmethod
+    def create(item):
+        """Returns a record for the passed ingredient. A record is returned unchanged, a list is converted.
+
+        :param item:A record or a list [id, e_number, ingrediens_list, remark, annotation, classification,
+        keywords_list].
+        :return:An instance of the class IngredientRecord.
+        """
+        try:
+            if isinstance(item, IngredientRecord):
+                return item
+
+            return IngredientRecord(*item)
+        except:
+            print('Error in method {0} in module {1}'.format('create', 'ingredient_record.py'))
+            return None
+
+    def to_list(self):
+        """Returns the record as list in the form
+        [id, e_number, ingrediens_list, remark, annotation, classification, keywords_list].
+
+        :return:The list.
+        """
+        try:
+            return [getattr(self, name) for name in IngredientRecord.__slots__]
+        except:
+            print('Error in method {0} in module {1}'.format('to_list', 'ingredient_record.py'))
+            return None
+
+    def __getitem__(self, index):
+        """Returns a property by its index in the list representation.
+
+        :param index:The index (0 to 6).
+        :return:The property.
+        """
+        return getattr(self, IngredientRecord.__slots__[index])
+
+    def __len__(self):
+        """Returns the number of properties.
+
+        :return:7
+        """
+        return len(IngredientRecord.__slots__)
+
+    def __iter__(self):
+        """Returns an iterator over the properties in the order of the list representation.
+
+        :return:An iterator.
+        """
+        return iter(self.to_list())
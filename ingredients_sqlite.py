@@ -0,0 +1,515 @@
+""" Function of ingredients_sqlite.py
+Keeps the ingredients in a SQLite database instead of memory. The database is built once from the JSON
+database and rebuilt whenever the JSON file changes. Lookups are indexed queries, so the memory needed does not
+grow with the number of ingredients, and several processes can read the same file.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+
+import constant as const
+from fuzzy_index import FuzzyIndex
+from ingredient_record import IngredientRecord
+from ingrediens import Ingredients, normalize_token
+
+SQLITE_FORMAT = 2
+"""Format of the SQLite database, to be increased whenever the tables change"""
+BATCH_SIZE = 500
+"""Maximum number of values passed to one query (SQLite limits the number of parameters)"""
+PADDING = '\x00'
+"""Character added twice at both ends of a search term before its trigrams are formed"""
+
+SCHEMA = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE ingredients (id INTEGER PRIMARY KEY, e_number TEXT, e_key TEXT, names TEXT, remark TEXT,
+                          annotation TEXT, classification TEXT, keywords TEXT);
+CREATE INDEX ingredients_e_key ON ingredients (e_key);
+CREATE TABLE search_terms (term_id INTEGER PRIMARY KEY, term TEXT UNIQUE, length INTEGER, id INTEGER);
+CREATE TABLE trigrams (gram TEXT, term_id INTEGER, PRIMARY KEY (gram, term_id)) WITHOUT ROWID;
+'''
+"""Tables of the SQLite database"""
+
+
+class SqliteIngredients:
+    """Provides the ingredients of the JSON database like the class Ingredients, but stores them in a SQLite
+    database (DATABASE_SQLITE). Only the results of the queries are kept in memory.
+
+    The search terms are the same as those of the class Ingredients. They are indexed in three ways:
+
+    - by the term itself, for exact lookups and lookups of beginnings (contains, contains_prefix)
+    - by the trigrams of the term, for finding the candidates of the fuzzy search (contains_fuzzy) and terms
+      containing a text (find_containing)
+    - by their length, for finding the terms contained in a text (find_all)
+
+    Several texts can be checked with one query (contains_many). A connection is opened for each thread, as
+    SQLite connections must not be shared between threads.
+    """
+
+    def __init__(self, db_path):
+        """The constructor. Opens an existing database (see instance).
+
+        :param db_path:The path of the SQLite database.
+        """
+        try:
+            self.db_path = db_path
+            self.local = threading.local()
+
+            meta = dict(self.connection().execute('SELECT key, value FROM meta').fetchall())
+
+            self.version = meta['version']
+            self.usePatch = meta['usePatch'] == 'True'
+            self.max_length = int(meta['max_length'])
+            self.fuzzy_index = FuzzyIndex({})
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'ingredients_sqlite.py'))
+
+    @staticmethod
+    def instance(json_path, usePatch=True, db_path=None):
+        """Returns an instance based on the JSON file named in json_path. The SQLite database is only built if
+        it does not exist or was built from another content of the JSON file or with other settings.
+
+        :param json_path:The path to the Json file that serves as the database.
+        :param usePatch:If true, special characters contained in search words are converted to normal
+        letters (e.g. ö -> o).
+        :param db_path:The path of the SQLite database. Default = DATABASE_SQLITE.
+        :return:An instance of the class SqliteIngredients.
+        """
+        try:
+            if db_path is None:
+                db_path = const.DATABASE_SQLITE
+
+            with open(json_path, mode='rb') as json_file:
+                content = json_file.read()
+
+            source = hashlib.sha1(content).hexdigest()
+
+            if SqliteIngredients.source(db_path) != [str(SQLITE_FORMAT), source, str(usePatch)]:
+                SqliteIngredients.build(json.loads(content.decode('utf-8'))['items'], db_path, source, usePatch)
+
+            return SqliteIngredients(db_path)
+        except:
+            print('Error in method {0} in module {1}'.format('instance', 'ingredients_sqlite.py'))
+            return None
+
+    @staticmethod
+    def source(db_path):
+        """Returns the format, the hash of the JSON file and the setting usePatch the database was built with.
+
+        :param db_path:The path of the SQLite database.
+        :return:A list [format, source, usePatch] or None if the database does not exist.
+        """
+        try:
+            if not os.path.isfile(db_path):
+                return None
+
+            connection = sqlite3.connect(pathlib.Path(db_path).absolute().as_uri() + '?mode=ro', uri=True)
+
+            try:
+                meta = dict(connection.execute('SELECT key, value FROM meta').fetchall())
+            finally:
+                connection.close()
+
+            return [meta.get('format'), meta.get('source'), meta.get('usePatch')]
+        except:
+            print('Error in method {0} in module {1}'.format('source', 'ingredients_sqlite.py'))
+            return None
+
+    @staticmethod
+    def build(items, db_path, source, usePatch=True):
+        """Builds the SQLite database from a list of ingredients. The search terms and the version are the same
+        as those of the class Ingredients.
+
+        :param items:A list of ingredients (lists or instances of IngredientRecord).
+        :param db_path:The path of the SQLite database.
+        :param source:The hash of the JSON file.
+        :param usePatch:If true, special characters contained in search words are converted to normal letters.
+        """
+        try:
+            ingrediens = Ingredients(items, usePatch)
+
+            # Build a temporary file first, so that other processes never open a half built database
+            temp_path = db_path + '.' + str(os.getpid()) + '.' + str(threading.get_ident())
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+
+            connection = sqlite3.connect(temp_path)
+
+            try:
+                connection.executescript(SCHEMA)
+
+                connection.executemany('INSERT OR REPLACE INTO ingredients VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                       [(x.id, x.e_number, ingrediens.normalize_enumber(x.e_number),
+                                         json.dumps(x.names, ensure_ascii=False), x.remark, x.annotation,
+                                         x.classification, json.dumps(x.keywords, ensure_ascii=False))
+                                        for x in ingrediens.items])
+
+                # Later ingredients replace earlier ones with the same search term, as in the class Ingredients
+                search_items = {}
+                for x in ingrediens.items:
+                    for term in ingrediens.search_terms(x):
+                        search_items[term] = x.id
+
+                connection.executemany('INSERT INTO search_terms (term, length, id) VALUES (?, ?, ?)',
+                                       [(term, len(term), id) for term, id in search_items.items()])
+
+                fuzzy_index = FuzzyIndex({})
+                terms = connection.execute('SELECT term_id, term FROM search_terms').fetchall()
+
+                connection.executemany('INSERT OR IGNORE INTO trigrams VALUES (?, ?)',
+                                       [(gram, term_id) for term_id, term in terms
+                                        for gram in SqliteIngredients.trigrams(fuzzy_index.canonical(term))])
+
+                connection.execute('CREATE INDEX search_terms_length ON search_terms (length)')
+
+                meta = {'format': str(SQLITE_FORMAT),
+                        'source': source,
+                        'usePatch': str(usePatch),
+                        'version': ingrediens.items_version(),
+                        'max_length': str(max([len(term) for term in search_items], default=0))}
+
+                connection.executemany('INSERT INTO meta VALUES (?, ?)', list(meta.items()))
+                connection.commit()
+            finally:
+                connection.close()
+
+            os.replace(temp_path, db_path)
+        except:
+            print('Error in method {0} in module {1}'.format('build', 'ingredients_sqlite.py'))
+
+    @staticmethod
+    def trigrams(text, padded=True):
+        """Returns the different trigrams of a text.
+
+        :param text:The text
+        :param padded:If true, the text is padded at both ends, so that its beginning and end form trigrams
+        of their own. Default = True.
+        :return:A set of trigrams
+        """
+        try:
+            if padded:
+                text = PADDING * 2 + text + PADDING * 2
+
+            return {text[i:i + 3] for i in range(len(text) - 2)}
+        except:
+            print('Error in method {0} in module {1}'.format('trigrams', 'ingredients_sqlite.py'))
+            return None
+
+    def connection(self):
+        """Returns the read-only connection of the current thread to the database.
+
+        :return:An instance of sqlite3.Connection.
+        """
+        try:
+            connection = getattr(self.local, 'connection', None)
+
+            if connection is None:
+                connection = sqlite3.connect(pathlib.Path(self.db_path).absolute().as_uri() + '?mode=ro', uri=True)
+                self.local.connection = connection
+
+            return connection
+        except:
+            print('Error in method {0} in module {1}'.format('connection', 'ingredients_sqlite.py'))
+            return None
+
+    def query_many(self, sql, values):
+        """Runs a query for many values in batches of BATCH_SIZE. The query must contain {0} at the place of the
+        list of parameters, e.g. SELECT ... WHERE term IN ({0}).
+
+        :param sql:The query.
+        :param values:A list of values.
+        :return:A list of the rows of all batches.
+        """
+        try:
+            rows = []
+
+            for i in range(0, len(values), BATCH_SIZE):
+                batch = values[i:i + BATCH_SIZE]
+                rows += self.connection().execute(sql.format(', '.join(['?'] * len(batch))), batch).fetchall()
+
+            return rows
+        except:
+            print('Error in method {0} in module {1}'.format('query_many', 'ingredients_sqlite.py'))
+            return None
+
+    def normalize(self, item):
+        """Converts a search string into the form of the search terms (see normalize_token of the ingredients).
+
+        :param item:The search string
+        :return:The normalized search string
+        """
+        try:
+            return normalize_token(str(item), self.usePatch)
+        except:
+            print('Error in method {0} in module {1}'.format('normalize', 'ingredients_sqlite.py'))
+            return None
+
+    def contains(self, item):
+        """Returns True and the ID of an ingredient if the transfer item could be assigned to a substance.
+        Otherwise, False and -1 are returned.
+
+        :param item:The element (searchstring) for which a check is to be made.
+        :return:True and the ID if exists, otherwise False.
+        """
+        try:
+            row = self.connection().execute('SELECT id FROM search_terms WHERE term = ?',
+                                            (self.normalize(item),)).fetchone()
+
+            if row is not None:
+                return True, row[0]
+            else:
+                return False, -1
+        except:
+            print('Error in method {0} in module {1}'.format('contains', 'ingredients_sqlite.py'))
+            return None
+
+    def contains_many(self, items):
+        """Checks all passed items with as few queries as possible, e.g. all texts of an image. Returns for each
+        item whether it could be assigned to a substance, and if so, the ID, the E-number and the (first) name of
+        the substance.
+
+        :param items:A list of elements (searchstrings) for which a check is to be made.
+        :return:A list of tuples (True, id, e_number, name) if exists, otherwise (False, -1, None, None).
+        """
+        try:
+            terms = [self.normalize(item) if item is not None else None for item in items]
+
+            rows = self.query_many('SELECT s.term, i.id, i.e_number, i.names FROM search_terms s '
+                                   'JOIN ingredients i ON i.id = s.id WHERE s.term IN ({0})',
+                                   sorted(set([term for term in terms if term is not None])))
+
+            found = {term: (True, id, e_number, json.loads(names)[0]) for term, id, e_number, names in rows}
+
+            return [found.get(term, (False, -1, None, None)) for term in terms]
+        except:
+            print('Error in method {0} in module {1}'.format('contains_many', 'ingredients_sqlite.py'))
+            return None
+
+    def contains_fuzzy(self, item, max_distance=None):
+        """Like contains, but also finds ingredients whose search term differs from the passed item by a few
+        characters. The distance and its limits are the same as those of the class FuzzyIndex.
+
+        The candidates are the search terms sharing enough trigrams with the item: An edit changes at most four
+        of its trigrams, so a term within the distance k shares all but 4k of them.
+
+        :param item:The element (searchstring) for which a check is to be made.
+        :param max_distance:The maximum edit distance. Default = FUZZY_MAX_DISTANCE.
+        :return:True, the ID and the distance if exists, otherwise False, -1 and None.
+        """
+        try:
+            token = self.normalize(item)
+
+            present, id = self.contains(token)
+            if present:
+                return True, id, 0.0
+
+            if not self.fuzzy_index.searchable(token):
+                return False, -1, None
+
+            limit = self.fuzzy_index.limit(token, max_distance)
+            grams = sorted(SqliteIngredients.trigrams(self.fuzzy_index.canonical(token)))
+
+            rows = self.query_many('SELECT term_id FROM trigrams WHERE gram IN ({0})', grams)
+
+            shared = {}
+            for (term_id,) in rows:
+                shared[term_id] = shared.get(term_id, 0) + 1
+
+            # grams are queried in batches, so the minimum number of shared trigrams is checked here
+            candidates = [term_id for term_id, count in shared.items() if count >= len(grams) - 4 * int(limit)]
+
+            sql = 'SELECT term, id FROM search_terms WHERE length BETWEEN {0} AND {1} AND term_id IN ({{0}})'
+            sql = sql.format(len(token) - int(limit), len(token) + int(limit))
+
+            best = None
+            for term, id in self.query_many(sql, candidates):
+                distance = self.fuzzy_index.distance(token, term)
+
+                if distance <= limit and (best is None or (distance, term) < (best[2], best[0])):
+                    best = (term, id, distance)
+
+            if best is not None:
+                return True, best[1], best[2]
+            else:
+                return False, -1, None
+        except:
+            print('Error in method {0} in module {1}'.format('contains_fuzzy', 'ingredients_sqlite.py'))
+            return None
+
+    def contains_prefix(self, item):
+        """Checks whether the passed item is the beginning of the search terms of exactly one ingredient. This
+        identifies words cut off by the recognizer (see TRUNCATED_LENGTH). The terms are found by a range query
+        on the index of the search terms.
+
+        :param item:The element (searchstring) for which a check is to be made.
+        :return:True, the ID and the number of ingredients (1) if unique, otherwise False, -1 and the number of
+        ingredients beginning with the item.
+        """
+        try:
+            prefix = self.normalize(item)
+
+            count, id = self.connection().execute('SELECT COUNT(DISTINCT id), MIN(id) FROM search_terms '
+                                                  'WHERE term >= ? AND term < ?',
+                                                  (prefix, prefix + '\U0010ffff')).fetchone()
+
+            if count == 1:
+                return True, id, count
+            else:
+                return False, -1, count
+        except:
+            print('Error in method {0} in module {1}'.format('contains_prefix', 'ingredients_sqlite.py'))
+            return None
+
+    def find_all(self, text):
+        """Finds all search terms contained in the passed text, e.g. the concatenated texts of a reading line.
+        All parts of the text with the length of a search term (LINE_MATCHING_MIN_LENGTH up to the longest term)
+        are looked up at once.
+
+        :param text:The text, normalized like the search terms (see normalize).
+        :return:A list of occurrences (start, end, id), where text[start:end] is the search term.
+        """
+        try:
+            parts = {}
+            for start in range(len(text)):
+                for end in range(start + const.LINE_MATCHING_MIN_LENGTH,
+                                 min(start + self.max_length, len(text)) + 1):
+                    parts.setdefault(text[start:end], []).append((start, end))
+
+            rows = self.query_many('SELECT term, id FROM search_terms WHERE term IN ({0})', sorted(parts))
+
+            matches = [(start, end, id) for term, id in rows for start, end in parts[term]]
+
+            return sorted(matches, key=lambda m: (m[1], m[0]))
+        except:
+            print('Error in method {0} in module {1}'.format('find_all', 'ingredients_sqlite.py'))
+            return None
+
+    def find_containing(self, text):
+        """Finds the search terms containing the passed text. The terms are preselected by the trigrams of the
+        text, so that only they are compared with the text.
+
+        :param text:The text, normalized like the search terms (see normalize).
+        :return:A list of tuples (search term, id).
+        """
+        try:
+            grams = sorted(SqliteIngredients.trigrams(self.fuzzy_index.canonical(text), padded=False))
+
+            if len(grams) == 0:
+                return [(term, id) for term, id in self.connection().execute(
+                    "SELECT term, id FROM search_terms WHERE instr(term, ?) > 0", (text,)).fetchall()]
+
+            rows = self.query_many('SELECT term_id FROM trigrams WHERE gram IN ({0})', grams)
+
+            shared = {}
+            for (term_id,) in rows:
+                shared[term_id] = shared.get(term_id, 0) + 1
+
+            candidates = [term_id for term_id, count in shared.items() if count == len(grams)]
+
+            return [(term, id) for term, id in self.query_many('SELECT term, id FROM search_terms '
+                                                               'WHERE term_id IN ({0})', candidates) if text in term]
+        except:
+            print('Error in method {0} in module {1}'.format('find_containing', 'ingredients_sqlite.py'))
+            return None
+
+    def get_record(self, id):
+        """Returns an ingredient based on the ID of the substance.
+
+        :param id:The ID for which an element is to be returned.
+        :return:The associated instance of IngredientRecord or None.
+        """
+        try:
+            row = self.connection().execute('SELECT id, e_number, names, remark, annotation, classification, '
+                                            'keywords FROM ingredients WHERE id = ?', (id,)).fetchone()
+
+            return self.to_record(row) if row is not None else None
+        except:
+            print('Error in method {0} in module {1}'.format('get_record', 'ingredients_sqlite.py'))
+            return None
+
+    def get_item(self, id):
+        """Returns an ingredient based on the ID of the substance.
+
+        :param id:The ID for which an element is to be returned.
+        :return:A list with the associated element, empty if the ID does not exist.
+        """
+        try:
+            record = self.get_record(id)
+
+            return [record] if record is not None else []
+        except:
+            print('Error in method {0} in module {1}'.format('get_item', 'ingredients_sqlite.py'))
+            return None
+
+    def get_by_enumber(self, e_number):
+        """Returns an ingredient based on its E-number. Case, spaces and hyphens are ignored (E 161 b = e161b).
+
+        :param e_number:The E-number for which an element is to be returned.
+        :return:The associated instance of IngredientRecord or None.
+        """
+        try:
+            e_key = str(e_number).lower().replace(' ', '').replace('-', '')
+            e_key = e_key if e_key.startswith('e') else 'e' + e_key
+
+            row = self.connection().execute('SELECT id, e_number, names, remark, annotation, classification, '
+                                            'keywords FROM ingredients WHERE e_key = ? ORDER BY id DESC',
+                                            (e_key,)).fetchone()
+
+            return self.to_record(row) if row is not None else None
+        except:
+            print('Error in method {0} in module {1}'.format('get_by_enumber', 'ingredients_sqlite.py'))
+            return None
+
+    def to_record(self, row):
+        """Converts a row of the table ingredients into a record.
+
+        :param row:The row (id, e_number, names, remark, annotation, classification, keywords).
+        :return:An instance of IngredientRecord.
+        """
+        try:
+            id, e_number, names, remark, annotation, classification, keywords = row
+
+            return IngredientRecord(id, e_number, json.loads(names), remark, annotation, classification,
+                                    json.loads(keywords))
+        except:
+            print('Error in method {0} in module {1}'.format('to_record', 'ingredients_sqlite.py'))
+            return None
+
+    def get_enumber(self, id):
+        """Returns the E-number of an ingredient based on the ID of the substance.
+
+        :param id:The Id for which an E-number is to be returned.
+        :return:The corresponding E-number.
+        """
+        try:
+            return self.connection().execute('SELECT e_number FROM ingredients WHERE id = ?', (id,)).fetchone()[0]
+        except:
+            print('Error in method {0} in module {1}'.format('get_enumber', 'ingredients_sqlite.py'))
+            return None
+
+    def get_name(self, id):
+        """Returns the names of an ingredient based on the ID of the substance.
+
+        :param id:The ID for which a name is to be returned.
+        :return:The corresponding names.
+        """
+        try:
+            return json.loads(self.connection().execute('SELECT names FROM ingredients WHERE id = ?',
+                                                        (id,)).fetchone()[0])
+        except:
+            print('Error in method {0} in module {1}'.format('get_name', 'ingredients_sqlite.py'))
+            return None
+
+    def get_remark(self, id):
+        """Returns the remark assigned to an ingredient based on the ID of the substance.
+
+        :param id:The ID for which a comment is to be returned.
+        :return:The corresponding remark.
+        """
+        try:
+            return self.connection().execute('SELECT remark FROM ingredients WHERE id = ?', (id,)).fetchone()[0]
+        except:
+            print('Error in method {0} in module {1}'.format('get_remark', 'ingredients_sqlite.py'))
+            return None
@@ -0,0 +1,82 @@
+class PrefixTrie:
+    """A trie of search terms, which finds the ingredients whose search terms begin with a given prefix. The
+    recognizer returns at most 16 characters, so long words are cut off (e.g. antioxidationsmi). If only one
+    ingredient has search terms beginning with such a prefix, the ingredient is identified nevertheless.
+
+    Each node stores the number of different ingredients below it, so a lookup only walks along the prefix and
+    its effort depends on the length of the prefix only.
+    """
+
+    def __init__(self, search_items):
+        """The constructor. Builds the trie.
+
+        :param search_items:A dictionary with the search terms as keys and the IDs as values.
+        """
+        try:
+            # a node consists of its children, the number of different IDs below it and one of these IDs
+            self.root = [{}, 0, None]
+
+            terminals = []
+
+            for key, value in search_items.items():
+                node = self.root
+
+                for c in key:
+                    child = node[0].get(c)
+
+                    if child is None:
+                        child = [{}, 0, None]
+                        node[0][c] = child
+
+                    node = child
+
+                terminals.append((node, value))
+
+            ids = {}
+            for node, value in terminals:
+                ids.setdefault(id(node), set()).add(value)
+
+            self.count(self.root, ids)
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'prefix_trie.py'))
+
+    def count(self, node, ids):
+        """Sets the number of different IDs below the passed node and its children.
+
+        :param node:The node
+        :param ids:A dictionary with the IDs of the search terms ending at a node (key = id of the node).
+        :return:The set of IDs below the node.
+        """
+        try:
+            below = set(ids.get(id(node), ()))
+
+            for child in node[0].values():
+                below |= self.count(child, ids)
+
+            node[1] = len(below)
+            node[2] = next(iter(below)) if len(below) > 0 else None
+
+            return below
+        except:
+            print('Error in method {0} in module {1}'.format('count', 'prefix_trie.py'))
+            return set()
+
+    def lookup(self, prefix):
+        """Searches the ingredients whose search terms begin with the passed prefix.
+
+        :param prefix:The prefix, normalized like the search terms (lowercase, without spaces).
+        :return:The number of different ingredients and, if it is exactly one, its ID (otherwise None).
+        """
+        try:
+            node = self.root
+
+            for c in prefix:
+                node = node[0].get(c)
+
+                if node is None:
+                    return 0, None
+
+            return node[1], node[2] if node[1] == 1 else None
+        except:
+            print('Error in method {0} in module {1}'.format('lookup', 'prefix_trie.py'))
+            return None
@@ -1,11 +1,17 @@
 import json
 
+import constant as const
+from crop_cache import CropCache
+
 
 class Recognizer:
     """Represents an abstract recognizer. Provides functionality to recognize text in images (as np array).
     The module and the class name of a bridge are transferred to a real model. The bridge class must have a
     parameterless constructor and a method named scan. The scan method passes the image to be analyzed as the
     only parameter. It returns the recognized text.
+
+    If RECOGNIZER_CACHE is set and the bridge provides the methods preprocess_image and predict_preprocessed,
+    the predicted texts are cached (see CropCache). Repeated drawing files then skip the model.
     """
 
     def __init__(self, module_name, class_name):
@@ -18,7 +24,14 @@ class Recognizer:
             module = __import__(module_name)
             my_class = getattr(module, class_name)
 
+            self.module_name = module_name
+            self.class_name = class_name
+
             self.instance = my_class()
+
+            self.cache = None
+            if const.RECOGNIZER_CACHE and hasattr(self.instance, 'predict_preprocessed'):
+                self.cache = CropCache()
         except:
             print('Error in method {0} in module {1}'.format('init', 'recognizer.py'))
 
@@ -47,7 +60,87 @@ class Recognizer:
         :return:A string representing the recognized text.
         """
         try:
+            if self.cache is not None:
+                return self.scann_cached([image])[0]
+
             return self.instance.scann(image)
         except:
             print('Error in method {0} in module {1}'.format('scann', 'recognizer.py'))
             return None
+
+    def scann_batch(self, images):
+        """Examines all passed images at once by passing them to the current bridge of the class. If the bridge
+        does not provide a method named scann_batch, the images are examined one after the other.
+
+        :param images:A list of images (as np array) to be examined
+        :return:A list of strings representing the recognized texts in the order of the images.
+        """
+        try:
+            if self.cache is not None:
+                return self.scann_cached(images)
+
+            if hasattr(self.instance, 'scann_batch'):
+                return self.instance.scann_batch(images)
+
+            return [self.instance.scann(image) for image in images]
+        except:
+            print('Error in method {0} in module {1}'.format('scann_batch', 'recognizer.py'))
+            return None
+
+    def stage_config(self):
+        """Returns the configuration of the stage recognize, consisting of the bridge and the configuration given
+        by the bridge (if it provides a method stage_config).
+
+        :return:A dictionary with the configuration of the stage recognize.
+        """
+        try:
+            config = {}
+            if hasattr(self.instance, 'stage_config'):
+                config = self.instance.stage_config()
+
+            return {'recognize': dict({'module': self.module_name, 'class': self.class_name},
+                                      **config.get('recognize', {}))}
+        except:
+            print('Error in method {0} in module {1}'.format('stage_config', 'recognizer.py'))
+            return None
+
+    def scann_cached(self, images):
+        """Examines the passed images using the cache. The images are preprocessed by the bridge and looked up in
+        the cache. Only the images not found are passed to the model, identical images only once.
+
+        :param images:A list of images (as np array) to be examined
+        :return:A list of strings representing the recognized texts in the order of the images.
+        """
+        try:
+            texts = [None] * len(images)
+            preprocessed = [self.instance.preprocess_image(image) for image in images]
+
+            # the positions of the images not found in the cache, grouped by key
+            missing = {}
+
+            for i, img in enumerate(preprocessed):
+                if img is None:
+                    continue
+
+                key = self.cache.key(img)
+                text = self.cache.get(key)
+
+                if text is not None:
+                    texts[i] = text
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            if len(missing) > 0:
+                keys = list(missing.keys())
+                predicted = self.instance.predict_preprocessed([preprocessed[missing[key][0]] for key in keys])
+
+                for key, text in zip(keys, predicted):
+                    self.cache.put(key, text)
+
+                    for i in missing[key]:
+                        texts[i] = text
+
+            return texts
+        except:
+            print('Error in method {0} in module {1}'.format('scann_cached', 'recognizer.py'))
+            return None
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import constant as const
+
+MATCHING_SETTINGS = ['FUZZY_MATCHING', 'FUZZY_MAX_DISTANCE', 'FUZZY_MIN_LENGTH', 'FUZZY_CONFUSION_COST',
+                     'LINE_MATCHING', 'LINE_MATCHING_MIN_LENGTH', 'TRUNCATED_LENGTH']
+"""Names of the constants affecting the matches with the ingredients, which are part of the key as well"""
+RECOGNITION_SETTINGS = ['RECOGNIZER_CACHE_TOLERANCE']
+"""Names of the constants affecting the predicted texts, which are part of the key as well"""
+RESULT_FORMAT = 2
+"""Version of the format of the results (2: the matches contain the distance), which is part of the key as well"""
+
+
+class ResultCache:
+    """A cache for the results of whole images. A result consists of the boxes, the predicted texts and the
+    matches with the ingredients of an image. With a cached result the annotated image can be drawn again
+    without using the neural networks.
+
+    The key of a result is a hash of the decoded image, the configuration of the bridges (bridges.json and
+    bridges_config.py), the settings of the recognition and the matching (RECOGNITION_SETTINGS, MATCHING_SETTINGS
+    and usePatch) and the version of the database of ingredients. If one of them changes, the old results are no
+    longer found.
+
+    The results are kept in memory and the least recently used results are dropped when the number of results
+    or their size exceeds the limits. Optionally, the results are also written to a directory, where they
+    survive a restart of the application.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, cache_dir=None, usePatch=False):
+        """The constructor.
+
+        :param max_entries:The maximum number of results kept in memory. Default = RESULT_CACHE_ENTRIES.
+        :param max_bytes:The maximum size of the results kept in memory. Default = RESULT_CACHE_BYTES.
+        :param cache_dir:An optional directory in which the results are stored as well. Default = RESULT_CACHE_DIR.
+        :param usePatch:The setting usePatch of the scanner using the cache. Default = False.
+        """
+        try:
+            self.max_entries = max_entries if max_entries is not None else const.RESULT_CACHE_ENTRIES
+            self.max_bytes = max_bytes if max_bytes is not None else const.RESULT_CACHE_BYTES
+            self.cache_dir = cache_dir if cache_dir is not None else const.RESULT_CACHE_DIR
+
+            if self.cache_dir is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+
+            self.entries = OrderedDict()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.lock = threading.Lock()
+
+            self.config = ResultCache.config_fingerprint(usePatch=usePatch)
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'result_cache.py'))
+
+    @staticmethod
+    def config_fingerprint(paths=None, usePatch=False):
+        """Returns a hash of the files defining the bridges and of the settings of the recognition and the
+        matching.
+
+        :param paths:The files to be hashed. Default = BRIDGES_JSON and BRIDGES_CONFIG.
+        :param usePatch:If true, umlauts are treated as a, o and u in the matching. Default = False.
+        :return:The hash as hex string.
+        """
+        try:
+            if paths is None:
+                paths = [const.BRIDGES_JSON, const.BRIDGES_CONFIG]
+
+            digest = hashlib.sha1()
+
+            for path in paths:
+                with open(path, mode='rb') as file:
+                    digest.update(file.read())
+
+            settings = [RESULT_FORMAT, bool(usePatch)]
+            settings += [getattr(const, name) for name in RECOGNITION_SETTINGS + MATCHING_SETTINGS]
+            digest.update(json.dumps(settings).encode('utf-8'))
+
+            return digest.hexdigest()
+        except:
+            print('Error in method {0} in module {1}'.format('config_fingerprint', 'result_cache.py'))
+            return None
+
+    def key(self, img, db_version, rois=None):
+        """Returns the key of the result of an image.
+
+        :param img:The decoded image (as np array).
+        :param db_version:The version of the database of ingredients.
+        :param rois:The regions of interest the detection was restricted to. Default = None.
+        :return:The key as hex string.
+        """
+        try:
+            img = np.ascontiguousarray(img)
+
+            digest = hashlib.sha1()
+            digest.update(str((img.shape, img.dtype.str, self.config, db_version)).encode('utf-8'))
+            digest.update(img.data)
+
+            if rois is not None:
+                digest.update(str([np.asarray(roi).tolist() for roi in rois]).encode('utf-8'))
+
+            return digest.hexdigest()
+        except:
+            print('Error in method {0} in module {1}'.format('key', 'result_cache.py'))
+            return None
+
+    def get(self, key):
+        """Returns the result stored under the passed key. Results found only in the directory are taken over
+        into memory.
+
+        :param key:The key of the result.
+        :return:A dictionary with the boxes, texts and matches, or None if the result is not cached.
+        """
+        try:
+            with self.lock:
+                data = self.entries.get(key)
+
+                if data is not None:
+                    self.entries.move_to_end(key)
+
+            if data is None and self.cache_dir is not None:
+                path = os.path.join(self.cache_dir, key + '.pkl')
+
+                if os.path.isfile(path):
+                    with open(path, mode='rb') as file:
+                        data = file.read()
+
+                    self.store(key, data)
+
+            with self.lock:
+                if data is None:
+                    self.misses += 1
+                    return None
+
+                self.hits += 1
+
+            return pickle.loads(data)
+        except:
+            print('Error in method {0} in module {1}'.format('get', 'result_cache.py'))
+            return None
+
+    def put(self, key, boxes, texts, matches):
+        """Stores the result of an image.
+
+        :param key:The key of the result.
+        :param boxes:The boxes found by the detector.
+        :param texts:The predicted texts of the boxes.
+        :param matches:The matches of the texts with the ingredients (see match of the scanner).
+        """
+        try:
+            data = pickle.dumps({'boxes': boxes, 'texts': texts, 'matches': matches},
+                                protocol=pickle.HIGHEST_PROTOCOL)
+
+            self.store(key, data)
+
+            if self.cache_dir is not None:
+                path = os.path.join(self.cache_dir, key + '.pkl')
+
+                # Write to a temporary file first, so that no other process reads a half written result
+                temp_path = path + '.' + str(os.getpid()) + '.' + str(threading.get_ident())
+                with open(temp_path, mode='wb') as file:
+                    file.write(data)
+                os.replace(temp_path, path)
+        except:
+            print('Error in method {0} in module {1}'.format('put', 'result_cache.py'))
+
+    def store(self, key, data):
+        """Keeps a pickled result in memory and drops the least recently used results if a limit is exceeded.
+
+        :param key:The key of the result.
+        :param data:The pickled result.
+        """
+        try:
+            with self.lock:
+                if key in self.entries:
+                    self.size -= len(self.entries.pop(key))
+
+                self.entries[key] = data
+                self.size += len(data)
+
+                while len(self.entries) > self.max_entries or (self.size > self.max_bytes and len(self.entries) > 1):
+                    self.size -= len(self.entries.popitem(last=False)[1])
+        except:
+            print('Error in method {0} in module {1}'.format('store', 'result_cache.py'))
+
+    def statistics(self):
+        """Returns the number of hits and misses, the hit rate, the number of results in memory and their size.
+
+        :return:A dictionary of values.
+        """
+        try:
+            with self.lock:
+                requests = self.hits + self.misses
+
+                return {'hits': self.hits,
+                        'misses': self.misses,
+                        'hit_rate': self.hits / requests if requests > 0 else 0.0,
+                        'entries': len(self.entries),
+                        'bytes': self.size}
+        except:
+            print('Error in method {0} in module {1}'.format('statistics', 'result_cache.py'))
+            return None
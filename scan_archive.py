@@ -0,0 +1,310 @@
+""" Function of scan_archive.py
+Keeps the recognized texts and boxes of all examined images in an archive, so that the matches with the
+ingredients can be renewed after the database changed without repeating the detection and recognition.
+
+The archive is a JSON Lines file with one record per image. A record contains the input and output image, the
+boxes, the texts, the matches (including the distance of fuzzy matches) and the version of the database used for
+the matches.
+
+The re-match runs in a pool of worker processes. Each worker loads the database once. The archive is read and
+written line by line, so archives of any size can be processed. Scripts using the re-match must call it within
+if __name__ == '__main__'.
+
+Appending a record and replacing the archive after the re-match are guarded by a lock file next to the archive
+(path + '.lock'), so that records of other threads and processes (e.g. the workers of a BatchScanner) are neither
+mixed nor lost.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+import cv2
+import numpy as np
+
+import constant as const
+
+worker_scanner = None
+"""The scanner (without models) of the current worker process"""
+worker_output_dir = None
+"""The directory for the annotated images of the current worker process"""
+worker_kwargs = {}
+"""The arguments passed to the annotation of the current worker process"""
+archive_locks = {}
+"""The locks of the archives of this process by path, shared by all instances of the same archive"""
+archive_locks_lock = threading.Lock()
+"""The lock guarding archive_locks"""
+
+
+class ArchiveLock:
+    """A lock of an archive shared by all threads and processes. Within a process the threads are serialized by
+    a lock per archive. Between processes an exclusive lock on the lock file of the archive is held (flock, or
+    msvcrt.locking on Windows).
+    """
+
+    def __init__(self, path):
+        """The constructor.
+
+        :param path:The path of the archive.
+        """
+        try:
+            self.path = path + '.lock'
+            self.file = None
+
+            with archive_locks_lock:
+                self.lock = archive_locks.setdefault(os.path.abspath(path), threading.Lock())
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'scan_archive.py'))
+
+    def __enter__(self):
+        """Waits until no other thread or process holds the lock and acquires it.
+
+        :return:The lock.
+        """
+        self.lock.acquire()
+
+        try:
+            self.file = open(self.path, mode='a+b')
+
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            else:
+                self.file.seek(0)
+
+                # msvcrt.locking gives up after ten seconds, so it is repeated until the lock is acquired
+                while True:
+                    try:
+                        msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass
+        except:
+            print('Error in method {0} in module {1}'.format('enter', 'scan_archive.py'))
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Releases the lock.
+        """
+        try:
+            if self.file is not None:
+                if fcntl is not None:
+                    fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+                else:
+                    self.file.seek(0)
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+
+                self.file.close()
+                self.file = None
+        except:
+            print('Error in method {0} in module {1}'.format('exit', 'scan_archive.py'))
+        finally:
+            self.lock.release()
+
+
+def init_worker(usePatch, output_dir, kwargs):
+    """Initializes a worker process of the re-match. The worker creates a scanner without models, which only
+    loads the database of ingredients.
+
+    :param usePatch:If true, umlauts are treated as a, o and u
+    :param output_dir:The directory for the annotated images or None.
+    :param kwargs:Further arguments for the annotation (e.g. pos_annotation_constants).
+    """
+    global worker_scanner, worker_output_dir, worker_kwargs
+
+    try:
+        cv2.setNumThreads(1)
+
+        from scanner import Scanner
+
+        worker_scanner = Scanner(refresh_db=False, usePatch=usePatch, load_models=False, watch_interval=0)
+        worker_output_dir = output_dir
+        worker_kwargs = kwargs
+    except:
+        print('Error in method {0} in module {1}'.format('init_worker', 'scan_archive.py'))
+
+
+def output_name(input_file):
+    """Returns the file name of the annotated image of an input image. The name starts with a hash of the full
+    path, so that images with the same name in different directories do not overwrite each other.
+
+    :param input_file:The path of the input image.
+    :return:The file name of the annotated image.
+    """
+    try:
+        path_hash = hashlib.sha1(os.path.abspath(input_file).encode('utf-8')).hexdigest()[:16]
+
+        return path_hash + '_' + os.path.basename(input_file)
+    except:
+        print('Error in method {0} in module {1}'.format('output_name', 'scan_archive.py'))
+        return None
+
+
+def rematch_record(line):
+    """Matches the texts of a record with the database of the worker. If an output directory is given, the input
+    image is annotated again and written to the directory.
+
+    :param line:A record of the archive (JSON).
+    :return:The record (JSON) and whether its matches changed.
+    """
+    try:
+        record = json.loads(line)
+        db = worker_scanner.db
+
+        if record['db_version'] == db.version and worker_output_dir is None:
+            return line, False
+
+        boxes = [np.asarray(box, dtype=np.int32) for box in record['boxes']]
+
+        matches = [list(match) for match in worker_scanner.match(record['texts'], boxes, db=db)]
+        changed = matches != record['matches']
+
+        record['matches'] = matches
+        record['db_version'] = db.version
+
+        if worker_output_dir is not None and record['input_file'] is not None:
+            img_in = cv2.imread(record['input_file'])
+
+            if img_in is not None:
+                img_out = worker_scanner.annotate(img_in[:, :, ::-1], boxes, None, record['texts'],
+                                                  matches=matches, db=db, **worker_kwargs)
+
+                if img_out is not None:
+                    cv2.imwrite(os.path.join(worker_output_dir, output_name(record['input_file'])), img_out)
+
+        return json.dumps(record, ensure_ascii=False), changed
+    except:
+        print('Error in method {0} in module {1}'.format('rematch_record', 'scan_archive.py'))
+        return line, False
+
+
+class ScanArchive:
+    """An archive of the recognized texts and boxes of examined images (JSON Lines file).
+    """
+
+    def __init__(self, path=None):
+        """The constructor.
+
+        :param path:The path of the archive. Default = SCAN_ARCHIVE.
+        """
+        try:
+            self.path = path if path is not None else const.SCAN_ARCHIVE
+            self.lock = ArchiveLock(self.path)
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'scan_archive.py'))
+
+    def append(self, result, db_version):
+        """Appends the result of an image to the archive.
+
+        :param result:An instance of the class ScanResult with boxes, texts and matches.
+        :param db_version:The version of the database used for the matches.
+        """
+        try:
+            record = {'input_file': result.input_file,
+                      'output_file': result.output_file,
+                      'boxes': [np.asarray(box).tolist() for box in result.boxes] if result.boxes is not None else [],
+                      'texts': result.texts if result.texts is not None else [],
+                      'matches': [list(match) for match in result.matches] if result.matches is not None else [],
+                      'db_version': db_version}
+
+            line = json.dumps(record, ensure_ascii=False) + '\n'
+
+            # The file is opened and closed under the lock, so that no record is written to an archive replaced
+            # by a re-match and records of several threads or processes are not mixed
+            with self.lock:
+                with open(self.path, mode='a', encoding='utf-8') as archive_file:
+                    archive_file.write(line)
+        except:
+            print('Error in method {0} in module {1}'.format('append', 'scan_archive.py'))
+
+    def read(self):
+        """Reads the records of the archive one after the other.
+
+        :return:A generator of records (dictionaries).
+        """
+        with open(self.path, mode='r', encoding='utf-8') as archive_file:
+            for line in archive_file:
+                if line.strip():
+                    yield json.loads(line)
+
+    def rematch_lines(self, pool, temp_file, skip, chunksize):
+        """Matches the records of the archive in the worker pool and writes them to the temporary file.
+
+        :param pool:The pool of worker processes.
+        :param temp_file:The opened temporary file of the renewed archive.
+        :param skip:Number of records at the start of the archive, which were already written.
+        :param chunksize:Number of records handed to a worker at once.
+        :return:The number of records and the number of records whose matches changed.
+        """
+        try:
+            records = 0
+            changed = 0
+
+            with open(self.path, mode='r', encoding='utf-8') as archive_file:
+                lines = (line.rstrip('\n') for line in archive_file if line.strip())
+
+                for _ in range(skip):
+                    next(lines, None)
+
+                for line, line_changed in pool.imap(rematch_record, lines, chunksize):
+                    temp_file.write(line + '\n')
+
+                    records += 1
+                    changed += int(line_changed)
+
+            return records, changed
+        except:
+            print('Error in method {0} in module {1}'.format('rematch_lines', 'scan_archive.py'))
+            return None
+
+    def rematch(self, output_path=None, output_dir=None, workers=None, chunksize=None, usePatch=False, **kwargs):
+        """Matches the stored texts of all records with the current database of ingredients. The detection and
+        recognition are not repeated. Records already matched with the current database are taken over unchanged,
+        unless the images are to be annotated again.
+
+        :param output_path:The path of the renewed archive. Default = None (the archive is replaced).
+        :param output_dir:An optional directory into which the input images are written with the new annotation.
+        The file names start with a hash of the path of the input image.
+        :param workers:Number of worker processes. Default = REMATCH_WORKERS.
+        :param chunksize:Number of records handed to a worker at once. Default = REMATCH_CHUNKSIZE.
+        :param usePatch:If true, umlauts are treated as a, o and u
+        :param kwargs:Further arguments for the annotation (e.g. pos_annotation_constants).
+        :return:The number of records and the number of records whose matches changed.
+        """
+        try:
+            if workers is None:
+                workers = const.REMATCH_WORKERS if const.REMATCH_WORKERS is not None else os.cpu_count()
+            if chunksize is None:
+                chunksize = const.REMATCH_CHUNKSIZE
+
+            if output_dir is not None:
+                os.makedirs(output_dir, exist_ok=True)
+
+            temp_path = (output_path if output_path is not None else self.path) + '.' + str(os.getpid())
+
+            context = multiprocessing.get_context('spawn')
+
+            with context.Pool(processes=workers, initializer=init_worker,
+                              initargs=(usePatch, output_dir, kwargs)) as pool:
+                with open(temp_path, mode='w', encoding='utf-8') as temp_file:
+                    records, changed = self.rematch_lines(pool, temp_file, 0, chunksize)
+
+                # Records appended during the re-match are matched under the lock before the archive is replaced,
+                # so that no record of a running scan (of any process) is lost
+                with self.lock:
+                    with open(temp_path, mode='a', encoding='utf-8') as temp_file:
+                        new_records, new_changed = self.rematch_lines(pool, temp_file, records, chunksize)
+
+                    os.replace(temp_path, output_path if output_path is not None else self.path)
+
+            return records + new_records, changed + new_changed
+        except:
+            print('Error in method {0} in module {1}'.format('rematch', 'scan_archive.py'))
+            return None
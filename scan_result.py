@@ -0,0 +1,37 @@
+class ScanResult:
+    """Represents the result of the examination of one image by the scanner. Besides the paths of the input and
+    output image, it contains the boxes found by the detector and the texts predicted by the recognizer in the
+    order of the boxes, as well as the matches of the texts with the ingredients and the version of the database
+    used for the matches. Each match contains the distance between the text and the ingredient found (see
+    db_match of the scanner).
+
+    If no output image was written, the annotated image itself is stored in image. Images examined with scann_many
+    also keep the share of the image processed by the detector (processed_area_ratio, see scann_measured of the
+    detector). Between detection and recognition, stages keeps the intermediate results of the stage store (see
+    detect_staged of the scanner).
+    """
+
+    def __init__(self, input_file=None, output_file=None, index=0):
+        """The constructor.
+
+        :param input_file:The input image (path). Default = None.
+        :param output_file:The output image (path). Default = None.
+        :param index:The position of the image in a list of images to be examined. Default = 0.
+        """
+        try:
+            self.input_file = input_file
+            self.output_file = output_file
+            self.index = index
+
+            self.image = None
+            self.boxes = None
+            self.crops = None
+            self.texts = None
+            self.matches = None
+            self.key = None
+            self.processed_area_ratio = None
+            self.stages = None
+            self.db_version = None
+            self.success = False
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'scan_result.py'))
@@ -1,3 +1,6 @@
+import os
+import threading
+
 import cv2
 import numpy as np
 
@@ -5,33 +8,170 @@ import constant as const
 from bounding_box_image_handler import BoundingBoxImageHandler as box_handler
 from detector import Detector
 from ingrediens import Ingredients
+from ingredients_sqlite import SqliteIngredients
 from recognizer import Recognizer
+from result_cache import ResultCache
+from scan_archive import ScanArchive
+from scan_result import ScanResult
+from stage_store import StageStore
+from scanner_pipeline import ScannerPipeline
 
 
 class Scanner:
     """The central class scanner controls the entire application and generates an OCR pipeline.
     The neural networks used are defined via a JSON file. The storage location of the JSON file is
     stored as a constant in BRIDGES_JSON.
+
+    While the scanner is running, a background thread checks whether the JSON database changed (see watch_db).
+    A changed database is loaded completely before it replaces the current one, so the models stay loaded and
+    every examination of an image uses one consistent version of the database.
     """
 
-    def __init__(self, refresh_db=False, usePatch=False):
+    def __init__(self, refresh_db=False, usePatch=False, cache=None, stage_store=None, archive=None,
+                 load_models=True, watch_interval=None):
         """The constructor.
 
         :param refresh_db:If True, the database is updated using the stored Excel file.
         :param usePatch:If true, umlauts are treated as a, o and u
+        :param cache:An optional instance of the class ResultCache. If None, a result cache is only created if
+        RESULT_CACHE is set.
+        :param stage_store:An optional instance of the class StageStore. If None, a stage store is only created if
+        STAGE_STORE is set.
+        :param archive:An optional instance of the class ScanArchive, in which the texts and boxes of every image
+        examined with scann_file or scann_many are stored. If None, an archive is only created if SCAN_ARCHIVE
+        is set.
+        :param load_models:If False, the detector and the recognizer are not loaded. Such a scanner can only
+        match and annotate texts already recognized (e.g. from an archive). Default = True.
+        :param watch_interval:Interval in seconds in which the database is checked for changes. None or 0 means
+        no reload. Default = DB_WATCH_INTERVAL.
         """
         try:
-            self.detector = Detector.instance(const.BRIDGES_JSON)
-            self.recognizer = Recognizer.instance(const.BRIDGES_JSON)
+            self.detector = None
+            self.recognizer = None
+
+            if load_models:
+                self.detector = Detector.instance(const.BRIDGES_JSON)
+                self.recognizer = Recognizer.instance(const.BRIDGES_JSON)
 
             # Create database of ingredients, transfer excel data beforehand
             if refresh_db == True:
                 Ingredients.convert(const.DATABASE_EXCEL, const.DATABASE_JSON)
 
-            self.db = Ingredients.instance(const.DATABASE_JSON, usePatch=usePatch)
+            self.usePatch = usePatch
+            self.db_stat = self.stat_db()
+            self.db = self.load_db()
+
+            if cache is None and const.RESULT_CACHE:
+                cache = ResultCache(usePatch=usePatch)
+
+            if stage_store is None and const.STAGE_STORE:
+                stage_store = StageStore()
+
+            if archive is None and const.SCAN_ARCHIVE is not None:
+                archive = ScanArchive()
+
+            self.cache = cache
+            self.stage_store = stage_store
+            self.archive = archive
+            self.pipeline = None
+
+            if watch_interval is None:
+                watch_interval = const.DB_WATCH_INTERVAL
+
+            self.db_watcher = None
+            self.db_stop = threading.Event()
+
+            if watch_interval:
+                self.db_watcher = threading.Thread(target=self.watch_db, args=(watch_interval,), daemon=True)
+                self.db_watcher.start()
         except:
             print('Error in method {0} in module {1}'.format('init', 'scanner.py'))
 
+    def load_db(self):
+        """Loads the JSON database with the storage defined in DATABASE_BACKEND.
+
+        :return:An instance of the class Ingredients or SqliteIngredients.
+        """
+        try:
+            if const.DATABASE_BACKEND == 'sqlite':
+                return SqliteIngredients.instance(const.DATABASE_JSON, usePatch=self.usePatch)
+
+            return Ingredients.instance(const.DATABASE_JSON, usePatch=self.usePatch)
+        except:
+            print('Error in method {0} in module {1}'.format('load_db', 'scanner.py'))
+            return None
+
+    def stat_db(self):
+        """Returns the modification time and size of the JSON database, which change whenever it is written.
+
+        :return:A tuple (modification time in nanoseconds, size) or None if the file does not exist.
+        """
+        try:
+            if not os.path.isfile(const.DATABASE_JSON):
+                return None
+
+            stat = os.stat(const.DATABASE_JSON)
+
+            return stat.st_mtime_ns, stat.st_size
+        except:
+            print('Error in method {0} in module {1}'.format('stat_db', 'scanner.py'))
+            return None
+
+    def reload_db(self):
+        """Loads the JSON database again if it changed since it was loaded. The new database is built completely
+        before it replaces the current one. Examinations already running keep the database they started with.
+
+        :return:True if a new database was loaded, otherwise False.
+        """
+        try:
+            stat = self.stat_db()
+
+            if stat is None or stat == self.db_stat:
+                return False
+
+            # The state taken before loading is kept, so a change during loading is noticed the next time.
+            # It is only kept after a successful load, so a half-written file is tried again.
+            db = self.load_db()
+
+            if db is None or db.version is None:
+                return False
+
+            if self.db is not None and db.version == self.db.version:
+                self.db_stat = stat
+                return False
+
+            self.db = db
+            self.db_stat = stat
+
+            return True
+        except:
+            print('Error in method {0} in module {1}'.format('reload_db', 'scanner.py'))
+            return False
+
+    def watch_db(self, interval):
+        """Checks the JSON database for changes until stop_watching is called (see reload_db). Runs in the
+        background thread of the scanner.
+
+        :param interval:The interval of the checks in seconds.
+        """
+        try:
+            while not self.db_stop.wait(interval):
+                self.reload_db()
+        except:
+            print('Error in method {0} in module {1}'.format('watch_db', 'scanner.py'))
+
+    def stop_watching(self):
+        """Stops checking the database for changes.
+        """
+        try:
+            self.db_stop.set()
+
+            if self.db_watcher is not None:
+                self.db_watcher.join()
+                self.db_watcher = None
+        except:
+            print('Error in method {0} in module {1}'.format('stop_watching', 'scanner.py'))
+
     def auto_scann(self, input_file, output_file, pos_annotation_constants=None, neg_annotation_constants=None,
                    eval_annotation_constants=None):
         """Automatically performs all text recognition and ingredient matching steps.
@@ -54,8 +194,49 @@ class Scanner:
         except:
             print('Error in method {0} in module {1}'.format('auto_scann', 'scanner.py'))
 
+    def scann_file(self, input_file, output_file=None, rois=None, **kwargs):
+        """Examines the passed input image and writes the annotated image to the output image. Unlike auto_scann,
+        the boxes and texts found are returned.
+
+        :param input_file:The input image (path).
+        :param output_file:The output image (path). If None, the annotated image is returned in the result.
+        :param rois:Optional regions of the image to which the detection is restricted (see detect).
+        :param kwargs:Further arguments as for scann (e.g. evaluation_mode or pos_annotation_constants).
+        :return:An instance of the class ScanResult.
+        """
+        try:
+            result = ScanResult(input_file, output_file)
+
+            img_in = cv2.imread(input_file)
+
+            if img_in is not None:
+                img_in = img_in[:, :, ::-1]
+
+                db = self.db
+                result.db_version = db.version
+
+                result.boxes, detail_imgs, result.texts, result.matches = self.analyse(img_in, rois, db=db)
+                img_out = self.annotate(img_in, result.boxes, detail_imgs, result.texts, matches=result.matches,
+                                        db=db, **kwargs)
+
+                if self.archive is not None:
+                    self.archive.append(result, result.db_version)
+
+                if img_out is not None:
+                    if output_file is not None:
+                        result.success = cv2.imwrite(output_file, img_out)
+                    else:
+                        result.image = img_out
+                        result.success = True
+
+            return result
+        except:
+            print('Error in method {0} in module {1}'.format('scann_file', 'scanner.py'))
+            return None
+
     def scann(self, img, evaluation_mode=False, print_detail=False, print_format='jpg', small_annotation=True,
-              pos_annotation_constants=None, neg_annotation_constants=None, eval_annotation_constants=None):
+              pos_annotation_constants=None, neg_annotation_constants=None, eval_annotation_constants=None,
+              rois=None):
         """Performs text recognition and matching with ingredients. As a result, the image extended by bounding
         boxes is returned.
 
@@ -68,44 +249,367 @@ class Scanner:
         :param pos_annotation_constants:Defining the text output of a positive annotation. Default = None.
         :param neg_annotation_constants:Defining the text output of a negative annotation. Default = None.
         :param eval_annotation_constants:Defining the text output for evaluation purposes. Default = None.
+        :param rois:Optional regions of the image to which the detection is restricted, e.g. the label panel
+        (see detect). The annotation is drawn on the whole image. Default = None.
         :return:The image extended by bounding boxes.
         """
         try:
-            boxes = self.detector.scann(img)
+            db = self.db
+
+            boxes, detail_imgs, detail_txts, matches = self.analyse(img, rois, db=db)
+
+            return self.annotate(img, boxes, detail_imgs, detail_txts, matches=matches, db=db,
+                                 evaluation_mode=evaluation_mode,
+                                 print_detail=print_detail, print_format=print_format,
+                                 small_annotation=small_annotation,
+                                 pos_annotation_constants=pos_annotation_constants,
+                                 neg_annotation_constants=neg_annotation_constants,
+                                 eval_annotation_constants=eval_annotation_constants)
+        except:
+            print('Error in method {0} in module {1}'.format('scann', 'scanner.py'))
+            return None
 
-            #
-            # If you draw step-by-step on only one image and additionally generate details for prediction from
-            # this image, it can happen that the generated detail images and thus the results are falsified.
-            #
-            # Therefore, the detail images are generated using a copy.
-            #
-            outimg = np.copy(img)
-            #
+    def scann_many(self, input_files, output_files=None, decode_workers=None, output_workers=None, queue_size=None,
+                   **kwargs):
+        """Examines several images in a pipeline. Reading, detection, recognition and the output of the images
+        run in their own stages, which are connected by bounded queues. This way image N+1 is already in
+        detection while image N is still in recognition.
+
+        The pipeline of the last call is kept in the attribute pipeline. Its method statistics returns the queue
+        depths and the throughput of every stage, also while the pipeline is running.
+
+        :param input_files:A list of input images (paths).
+        :param output_files:An optional list of output images (paths). If None, the annotated images are returned
+        in the results instead of being written.
+        :param decode_workers:Number of threads for reading the images. Default = PIPELINE_DECODE_WORKERS.
+        :param output_workers:Number of threads for annotating and writing the images.
+        Default = PIPELINE_OUTPUT_WORKERS.
+        :param queue_size:The maximum number of images waiting between two stages. Default = PIPELINE_QUEUE_SIZE.
+        :param kwargs:Further arguments as for scann (e.g. evaluation_mode or pos_annotation_constants).
+        :return:A list of instances of the class ScanResult in the order of the input images.
+        """
+        try:
+            self.pipeline = ScannerPipeline(self, decode_workers=decode_workers, output_workers=output_workers,
+                                            queue_size=queue_size, **kwargs)
 
-            pos_annotation_constants = pos_annotation_constants
-            neg_annotation_constants = neg_annotation_constants
-            eval_annotation_constants = eval_annotation_constants
+            return self.pipeline.run(input_files, output_files)
+        except:
+            print('Error in method {0} in module {1}'.format('scann_many', 'scanner.py'))
+            return None
 
-            if boxes is not None:
-                for box in boxes:
-                    # Determine a drawing file for each box
-                    detail_img = box_handler.get_subimage(outimg, box, greyscale=True, save=False)
+    def analyse(self, img, rois=None, db=None):
+        """Finds the text areas of the passed image, predicts their texts and matches them with the ingredients.
+
+        If the scanner has a result cache and the image was already examined with the same bridges and the same
+        database, the cached result is returned without using the neural networks. Drawing files are not cached,
+        in this case None is returned instead.
+
+        If the scanner has a stage store, only the stages whose configuration changed are repeated (see
+        analyse_staged). The stage store is not used for regions of interest.
+
+        :param img:The image to be examined (opened with Open CV as a numpy array).
+        :param rois:An optional list of regions of interest (see detect). Default = None.
+        :param db:The ingredients to match with. Default = None (the current database).
+        :return:The boxes, the drawing files, the predicted texts and the matches (see match).
+        """
+        try:
+            if db is None:
+                db = self.db
+
+            key = None
+
+            if self.cache is not None:
+                key = self.cache.key(img, db.version, rois)
+                entry = self.cache.get(key)
+
+                if entry is not None:
+                    return entry['boxes'], None, entry['texts'], entry['matches']
+
+            if self.stage_store is not None and rois is None:
+                boxes, detail_imgs, detail_txts = self.analyse_staged(img)
+            else:
+                boxes = self.detect(img, rois)
+                detail_imgs, detail_txts = self.recognize(img, boxes)
+
+            matches = self.match(detail_txts, boxes, db=db)
+
+            if key is not None:
+                self.cache.put(key, boxes, detail_txts, matches)
+
+            return boxes, detail_imgs, detail_txts, matches
+        except:
+            print('Error in method {0} in module {1}'.format('analyse', 'scanner.py'))
+            return None
+
+    def analyse_staged(self, img):
+        """Finds the text areas of the passed image and predicts their texts using the stored intermediate
+        results of the image. The examination resumes at the earliest stage whose configuration changed (see
+        StageStore), e.g. new thresholds for the boxes do not require another pass through the detector model.
+        Images the detector cannot split (see can_split, e.g. images examined in tiles) are detected as by
+        detect. The results of the repeated stages are stored.
+
+        :param img:The image to be examined (opened with Open CV as a numpy array).
+        :return:The boxes, the drawing files and the predicted texts.
+        """
+        try:
+            key, shard, fingerprints, valid, processed_area_ratio = self.detect_staged(img)
+            crops, texts = self.recognize_staged(img, key, shard, fingerprints, valid)
+
+            return shard['boxes'], crops, texts
+        except:
+            print('Error in method {0} in module {1}'.format('analyse_staged', 'scanner.py'))
+            return None
+
+    def detect_staged(self, img):
+        """The first part of analyse_staged: Finds the text areas of the passed image, repeating only the
+        detection stages whose configuration changed.
+
+        :param img:The image to be examined (opened with Open CV as a numpy array).
+        :return:The key of the image, its stored results completed up to the boxes, the fingerprints of the stages,
+        the number of valid stages (see recognize_staged) and the share of the image passed through the detector
+        model (0.0 if the boxes were stored).
+        """
+        try:
+            key = self.stage_store.key(img)
+            shard = self.stage_store.load(key)
+
+            configs = dict(self.detector.stage_config(), crops={}, **self.recognizer.stage_config())
+            fingerprints = self.stage_store.fingerprints(configs)
+            valid = self.stage_store.valid_stages(shard, fingerprints)
+
+            processed_area_ratio = 0.0
+
+            if self.detector.can_split(img):
+                if valid < 1 or shard.get('score_map') is None:
+                    valid = 0
+                    shard['score_map'], shard['geo_map'], shard['ratios'] = self.detector.forward(img)
+                    processed_area_ratio = 1.0
+                if valid < 2:
+                    shard['boxes'] = self.detector.decode_maps(shard['score_map'], shard['geo_map'], shard['ratios'])
+            elif valid < 2:
+                # e.g. tiled images, the output of the model is not stored
+                shard['score_map'] = None
+                shard['boxes'], processed_area_ratio = self.detector.scann_measured(img)
+
+            return key, shard, fingerprints, valid, processed_area_ratio
+        except:
+            print('Error in method {0} in module {1}'.format('detect_staged', 'scanner.py'))
+            return None
+
+    def recognize_staged(self, img, key, shard, fingerprints, valid):
+        """The second part of analyse_staged: Cuts out the text areas and predicts their texts, if these stages
+        are not valid, and stores the results of the image.
+
+        :param img:The image to be examined (opened with Open CV as a numpy array).
+        :param key:The key of the image (see detect_staged).
+        :param shard:The stored results of the image completed up to the boxes (see detect_staged).
+        :param fingerprints:The fingerprints of the stages (see detect_staged).
+        :param valid:The number of valid stages (see detect_staged).
+        :return:A list of drawing files and a list of the predicted texts, both in the order of the boxes.
+        """
+        try:
+            if valid < 3:
+                shard['crops'] = self.crop(img, shard['boxes'])
+            if valid < 4:
+                shard['texts'] = self.predict_texts(shard['crops'], greyscale=False)
+
+                shard['fingerprints'] = fingerprints
+                self.stage_store.save(key, shard)
+
+            return shard['crops'], shard['texts']
+        except:
+            print('Error in method {0} in module {1}'.format('recognize_staged', 'scanner.py'))
+            return None
+
+    def detect(self, img, rois=None):
+        """Uses the detector currently stored in the system to find the text areas of the passed image.
+
+        If regions of interest are passed, only these regions are cut out and examined, all of them at once.
+        A region is either a rectangle (x, y, width, height) or a polygon given by its points. For a polygon
+        its surrounding rectangle is examined. A single region may be passed instead of a list. The boxes found
+        are returned in the coordinates of the whole image. Boxes of overlapping regions are merged, so that a
+        text is only found once (see merge_regions of the detector). If none of the regions lies within the image,
+        the whole image is examined.
 
-                    # Predict a text for each drawing file.be careful about greyscale.
-                    detail_txt = self.predict_text(detail_img, greyscale=False)
+        :param img:The image to be examined (opened with Open CV as a numpy array).
+        :param rois:An optional list of regions of interest. Default = None (the whole image is examined).
+        :return:A list of boxes (each box defined with four points).
+        """
+        try:
+            if rois is None:
+                return self.detector.scann(img)
+
+            rects = [self.roi_rect(img, roi) for roi in self.roi_list(rois)]
+            rects = [rect for rect in rects if rect is not None]
+
+            if len(rects) == 0:
+                print('No valid region of interest, the whole image is examined')
+                return self.detector.scann(img)
+
+            results = self.detector.scann_batch([img[y0:y1, x0:x1] for x0, y0, x1, y1 in rects])
+
+            boxes = []
+            for result, (x0, y0, x1, y1) in zip(results, rects):
+                if result is None:
+                    continue
+
+                # translate the boxes into the coordinates of the whole image
+                for box in result:
+                    box = np.asarray(box)
+                    boxes.append(box + np.asarray([x0, y0], dtype=box.dtype))
+
+            if len(rects) > 1:
+                boxes = self.detector.merge_regions(boxes)
+
+            return boxes
+        except:
+            print('Error in method {0} in module {1}'.format('detect', 'scanner.py'))
+            return None
+
+    def roi_list(self, rois):
+        """Returns the passed regions of interest as a list. A single rectangle (x, y, width, height) or a single
+        polygon (a list of points) is put into a list.
+
+        :param rois:A list of regions of interest or a single region.
+        :return:A list of regions of interest.
+        """
+        try:
+            rois = list(rois)
+
+            if len(rois) > 0 and np.isscalar(rois[0]):
+                return [rois]
+
+            if len(rois) > 0 and len(rois[0]) == 2 and np.isscalar(rois[0][0]):
+                return [rois]
+
+            return rois
+        except:
+            print('Error in method {0} in module {1}'.format('roi_list', 'scanner.py'))
+            return []
+
+    def roi_rect(self, img, roi):
+        """Converts a region of interest into a rectangle within the passed image. Rectangles smaller than
+        ROI_MIN_SIZE are enlarged around their center, because the detector cannot examine them.
+
+        :param img:The image to be examined (opened with Open CV as a numpy array).
+        :param roi:A rectangle (x, y, width, height) or a polygon given by its points.
+        :return:The rectangle as (x0, y0, x1, y1) clipped to the image, or None if it lies outside the image or
+        the image is smaller than ROI_MIN_SIZE.
+        """
+        try:
+            roi = np.asarray(roi)
+
+            if roi.ndim == 1:
+                x, y, w, h = roi.astype(int)
+            else:
+                x, y, w, h = cv2.boundingRect(roi.reshape((-1, 2)).astype(np.int32))
+
+            x0 = max(x, 0)
+            y0 = max(y, 0)
+            x1 = min(x + w, img.shape[1])
+            y1 = min(y + h, img.shape[0])
+
+            if x1 <= x0 or y1 <= y0:
+                print('Region of interest {0} lies outside the image and is skipped'.format(roi.tolist()))
+                return None
+
+            size = const.ROI_MIN_SIZE
+            if img.shape[0] < size or img.shape[1] < size:
+                print('The image is smaller than {0} pixels, regions of interest are skipped'.format(size))
+                return None
+
+            if x1 - x0 < size:
+                x0 = min(max((x0 + x1 - size) // 2, 0), img.shape[1] - size)
+                x1 = x0 + size
+            if y1 - y0 < size:
+                y0 = min(max((y0 + y1 - size) // 2, 0), img.shape[0] - size)
+                y1 = y0 + size
+
+            return int(x0), int(y0), int(x1), int(y1)
+        except:
+            print('Error in method {0} in module {1}'.format('roi_rect', 'scanner.py'))
+            return None
 
+    def recognize(self, img, boxes):
+        """Cuts out a drawing file for each box and predicts the texts of all drawing files at once.
+
+        The drawing files are copies. Therefore the results are not falsified if boxes are drawn into the image
+        afterwards.
+
+        :param img:The image to be examined (opened with Open CV as a numpy array).
+        :param boxes:The boxes found by the detector.
+        :return:A list of drawing files and a list of the predicted texts, both in the order of the boxes.
+        """
+        try:
+            if boxes is None:
+                return [], []
+
+            detail_imgs = self.crop(img, boxes)
+
+            # Predict the texts of all drawing files at once. Be careful about greyscale.
+            detail_txts = self.predict_texts(detail_imgs, greyscale=False)
+
+            return detail_imgs, detail_txts
+        except:
+            print('Error in method {0} in module {1}'.format('recognize', 'scanner.py'))
+            return None
+
+    def crop(self, img, boxes):
+        """Cuts out a drawing file in grayscale for each box.
+
+        :param img:The image to be examined (opened with Open CV as a numpy array).
+        :param boxes:The boxes found by the detector.
+        :return:A list of drawing files in the order of the boxes.
+        """
+        try:
+            if boxes is None:
+                return []
+
+            return [box_handler.get_subimage(img, box, greyscale=True, save=False) for box in boxes]
+        except:
+            print('Error in method {0} in module {1}'.format('crop', 'scanner.py'))
+            return None
+
+    def annotate(self, img, boxes, detail_imgs, detail_txts, evaluation_mode=False, print_detail=False,
+                 print_format='jpg', small_annotation=True, pos_annotation_constants=None,
+                 neg_annotation_constants=None, eval_annotation_constants=None, matches=None, db=None):
+        """Matches the predicted texts with the ingredients and draws the boxes into the passed image. The
+        parameters correspond to those of scann.
+
+        :param img:The examined image (opened with Open CV as a numpy array).
+        :param boxes:The boxes found by the detector.
+        :param detail_imgs:The drawing files of the boxes or None (e.g. for a cached result).
+        :param detail_txts:The predicted texts of the boxes.
+        :param matches:The matches of the texts (see match). If None, the texts are matched here. Default = None.
+        :param db:The ingredients to match with. Default = None (the current database).
+        :return:The image extended by bounding boxes.
+        """
+        try:
+            if db is None:
+                db = self.db
+
+            if boxes is not None:
+                if detail_imgs is None:
+                    detail_imgs = [None] * len(detail_txts)
+                if matches is None:
+                    matches = [None] * len(detail_txts)
+
+                for box, detail_img, detail_txt, match in zip(boxes, detail_imgs, detail_txts, matches):
                     # Output single images, if desired
-                    if print_detail:
+                    if print_detail and detail_img is not None:
                         cv2.imwrite(const.OUTPUT_DIR + '/' + detail_txt + '.' + print_format, detail_img)
 
                     # Visualize (enter bounding boxes)
                     if evaluation_mode == False:
                         # Test whether it is an ingredient
-                        present, id, identification = self.db_contains(detail_txt)
+                        if match is None:
+                            match = self.db_match(detail_txt, db=db)
+
+                        present, id, identification = match[:3]
 
                         if present == True:
                             if (small_annotation):
-                                detail_name = self.db.get_enumber(id)
+                                detail_name = db.get_enumber(id)
                             else:
                                 detail_name = identification
 
@@ -126,7 +630,7 @@ class Scanner:
 
             return img[:, :, ::-1]
         except:
-            print('Error in method {0} in module {1}'.format('scann', 'scanner.py'))
+            print('Error in method {0} in module {1}'.format('annotate', 'scanner.py'))
             return None
 
     def predict_text(self, img, greyscale=True):
@@ -145,7 +649,181 @@ class Scanner:
             print('Error in method {0} in module {1}'.format('predict_text', 'scanner.py'))
             return None
 
-    def db_contains(self, searchstring):
+    def predict_texts(self, imgs, greyscale=True):
+        """Uses the recognizer currently stored in the system to predict the texts of all passed images at once.
+        The images are processed as a batch, which is considerably faster than predicting each image on its own.
+
+        :param imgs:A list of images with contained text
+        :param greyscale:If True, the passed images are converted to grayscale. Default is True.
+        :return:A list with the predicted texts in the order of the images
+        """
+        try:
+            if greyscale == True:
+                imgs = [cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) for img in imgs]
+
+            return self.recognizer.scann_batch(imgs)
+        except:
+            print('Error in method {0} in module {1}'.format('predict_texts', 'scanner.py'))
+            return None
+
+    def match(self, texts, boxes=None, db=None):
+        """Matches the passed texts with the ingredients (see db_match).
+
+        If LINE_MATCHING is set and the boxes are passed, the texts of each reading line are also searched
+        together (see match_lines). The ingredients found there only fill boxes whose own text is not an
+        ingredient, the longest ingredients first.
+
+        :param texts:A list of texts.
+        :param boxes:The boxes of the texts. Default = None.
+        :param db:The ingredients to match with. Default = None (the current database).
+        :return:A list with the result of db_match (present, id, identification, distance) for each text.
+        """
+        try:
+            if texts is None:
+                return []
+
+            if db is None:
+                db = self.db
+
+            # exact matches for all texts at once, the others are searched again allowing errors
+            matches = []
+            for text, (present, id, e_number, name) in zip(texts, db.contains_many(texts)):
+                if present:
+                    matches.append((True, id, e_number + ' - ' + name, 0.0))
+                else:
+                    matches.append(self.db_match(text, db=db))
+
+            if const.LINE_MATCHING and boxes is not None and len(boxes) == len(texts):
+                assigned = set()
+
+                for id, indices, length in sorted(self.match_lines(boxes, texts, db=db), key=lambda m: -m[2]):
+                    for i in indices:
+                        if i not in assigned and matches[i][0] == False:
+                            matches[i] = (True, id, self.identify(id, db=db), 0.0)
+                            assigned.add(i)
+
+            return matches
+        except:
+            print('Error in method {0} in module {1}'.format('match', 'scanner.py'))
+            return None
+
+    def match_lines(self, boxes, texts, db=None):
+        """Searches the texts of each reading line for ingredients. The normalized texts of the boxes of a line
+        are concatenated and searched in a single pass (see find_all of the ingredients). This finds
+        ingredients split into several boxes (e.g. Natrium diacetat) as well as ingredients merged with other
+        words in one box.
+
+        :param boxes:The boxes found by the detector.
+        :param texts:The predicted texts of the boxes.
+        :param db:The ingredients to search. Default = None (the current database).
+        :return:A list of matches (id, indices of the contributing boxes, length of the search term).
+        """
+        try:
+            if db is None:
+                db = self.db
+
+            matches = []
+
+            for line in self.reading_lines(boxes):
+                text = ''
+                owners = []
+
+                for i in line:
+                    token = db.normalize(texts[i]) if texts[i] is not None else ''
+                    text += token
+                    owners += [i] * len(token)
+
+                for start, end, id in db.find_all(text):
+                    matches.append((id, sorted(set(owners[start:end])), end - start))
+
+            return matches
+        except:
+            print('Error in method {0} in module {1}'.format('match_lines', 'scanner.py'))
+            return None
+
+    def reading_lines(self, boxes):
+        """Groups the boxes into reading lines. Boxes belong to the same line if their vertical centers differ
+        by at most half of their height. The boxes of a line are sorted from left to right.
+
+        :param boxes:The boxes found by the detector.
+        :return:A list of lines, each a list of indices of boxes.
+        """
+        try:
+            boxes = [np.asarray(box).reshape((-1, 2)) for box in boxes]
+
+            centers = [(box[:, 1].min() + box[:, 1].max()) / 2.0 for box in boxes]
+            heights = [box[:, 1].max() - box[:, 1].min() for box in boxes]
+
+            lines = []
+            line_center = 0.0
+            line_height = 0.0
+
+            for i in sorted(range(len(boxes)), key=lambda i: centers[i]):
+                if len(lines) > 0 and abs(centers[i] - line_center) <= 0.5 * max(heights[i], line_height):
+                    lines[-1].append(i)
+                    line_center = sum(centers[k] for k in lines[-1]) / len(lines[-1])
+                    line_height = max(line_height, heights[i])
+                else:
+                    lines.append([i])
+                    line_center = centers[i]
+                    line_height = heights[i]
+
+            return [sorted(line, key=lambda i: boxes[i][:, 0].min()) for line in lines]
+        except:
+            print('Error in method {0} in module {1}'.format('reading_lines', 'scanner.py'))
+            return None
+
+    def identify(self, id, db=None):
+        """Returns the textual description of an ingredient (E-number - name).
+
+        :param id:The ID of the ingredient.
+        :param db:The ingredients. Default = None (the current database).
+        :return:The textual description.
+        """
+        try:
+            if db is None:
+                db = self.db
+
+            return db.get_enumber(id) + ' - ' + db.get_name(id)[0]
+        except:
+            print('Error in method {0} in module {1}'.format('identify', 'scanner.py'))
+            return None
+
+    def db_match(self, searchstring, db=None):
+        """Like db_contains, but if FUZZY_MATCHING is set, an ingredient is also found if the search string
+        differs from it by a few characters (see contains_fuzzy of the ingredients). The distance is returned
+        as well.
+
+        Search strings of TRUNCATED_LENGTH characters may have been cut off by the recognizer. If they are not
+        found, they are also compared with the beginnings of the ingredients (see contains_prefix).
+
+        :param searchstring:The search string
+        :param db:The ingredients to search. Default = None (the current database).
+        :return:present, id, identification, distance (0 for an exact match, None if not present)
+        """
+        try:
+            if db is None:
+                db = self.db
+
+            if const.FUZZY_MATCHING:
+                present, id, distance = db.contains_fuzzy(searchstring)
+            else:
+                present, id = db.contains(searchstring)
+                distance = 0.0 if present else None
+
+            if not present and len(db.normalize(searchstring)) >= const.TRUNCATED_LENGTH:
+                present, id, count = db.contains_prefix(searchstring)
+                distance = 0.0 if present else None
+
+            if present:
+                return present, id, self.identify(id, db=db), distance
+            else:
+                return present, id, 'nicht vorhanden', distance
+        except:
+            print('Error in method {0} in module {1}'.format('db_match', 'scanner.py'))
+            return None
+
+    def db_contains(self, searchstring, db=None):
         """Checks whether an ingredient exists using the transferred string. If it exists, the
         return is as follows:
 
@@ -159,17 +837,14 @@ class Scanner:
             id=-1
             identification=not available
 
+        If FUZZY_MATCHING is set, small recognition errors are tolerated (see db_match).
+
         :param searchstring:The search string
+        :param db:The ingredients to search. Default = None (the current database).
         :return:present, id, identification
         """
         try:
-            present, id = self.db.contains(searchstring)
-
-            if present:
-                identification = self.db.get_enumber(id) + ' - ' + self.db.get_name(id)[0]
-                return present, id, identification
-            else:
-                return present, id, 'nicht vorhanden'
+            return self.db_match(searchstring, db=db)[:3]
         except:
             print('Error in method {0} in module {1}'.format('db_contains', 'scanner.py'))
             return None
@@ -0,0 +1,310 @@
+import queue
+import threading
+import time
+
+import cv2
+
+import constant as const
+from scan_result import ScanResult
+
+
+class PipelineStage:
+    """A stage of the pipeline of the scanner. One or more threads take the items from the input queue, process
+    them with the passed function and put them into the output queue. The end of the input is marked by None,
+    which is passed on to the output queue as soon as all threads of the stage are finished.
+
+    Each stage counts the processed items and the time spent processing them.
+    """
+
+    def __init__(self, name, function, in_queue, out_queue, workers=1):
+        """The constructor.
+
+        :param name:The name of the stage.
+        :param function:The function that processes an item and returns it.
+        :param in_queue:The queue from which the items are taken.
+        :param out_queue:The queue into which the processed items are put.
+        :param workers:The number of threads of the stage. Default = 1.
+        """
+        try:
+            self.name = name
+            self.function = function
+            self.in_queue = in_queue
+            self.out_queue = out_queue
+            self.workers = workers
+
+            self.items = 0
+            self.busy = 0.0
+            self.running = 0
+            self.lock = threading.Lock()
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'scanner_pipeline.py'))
+
+    def start(self):
+        """Starts the threads of the stage.
+        """
+        try:
+            self.running = self.workers
+
+            for i in range(self.workers):
+                thread = threading.Thread(target=self.run, name=self.name + '-' + str(i), daemon=True)
+                thread.start()
+        except:
+            print('Error in method {0} in module {1}'.format('start', 'scanner_pipeline.py'))
+
+    def run(self):
+        """Processes items until the end of the input is reached. The thread that receives the end mark hands it
+        over to the other threads of the stage. The last thread passes it on to the next stage.
+        """
+        while True:
+            item = self.in_queue.get()
+
+            if item is None:
+                with self.lock:
+                    self.running -= 1
+                    last = self.running == 0
+
+                if last:
+                    self.out_queue.put(None)
+                else:
+                    self.in_queue.put(None)
+                return
+
+            start = time.time()
+
+            try:
+                item = self.function(item)
+            except:
+                print('Error in method {0} in module {1}'.format(self.name, 'scanner_pipeline.py'))
+
+            with self.lock:
+                self.items += 1
+                self.busy += time.time() - start
+
+            self.out_queue.put(item)
+
+
+class ScannerPipeline:
+    """Examines several images with a scanner in a pipeline of four stages connected by bounded queues:
+
+        decode:Reads the images (several threads).
+        detect:Finds the text areas with the detector.
+        recognize:Cuts out the text areas and predicts their texts with the recognizer.
+        output:Matches the texts with the ingredients, annotates and writes the images (several threads).
+
+    The stages run at the same time, so image N+1 is already in detection while image N is in recognition.
+    The results are returned in the order of the input images.
+
+    If the scanner has a result cache, cached images skip detection and recognition. If the scanner has a stage
+    store, detection and recognition only repeat the stages whose configuration changed (see analyse_staged of
+    the scanner).
+    """
+
+    def __init__(self, scanner, decode_workers=None, output_workers=None, queue_size=None, **kwargs):
+        """The constructor.
+
+        :param scanner:An instance of the class Scanner.
+        :param decode_workers:Number of threads for reading the images. Default = PIPELINE_DECODE_WORKERS.
+        :param output_workers:Number of threads for annotating and writing the images.
+        Default = PIPELINE_OUTPUT_WORKERS.
+        :param queue_size:The maximum number of images waiting between two stages. Default = PIPELINE_QUEUE_SIZE.
+        :param kwargs:Further arguments passed to the method annotate of the scanner.
+        """
+        try:
+            if decode_workers is None:
+                decode_workers = const.PIPELINE_DECODE_WORKERS
+            if output_workers is None:
+                output_workers = const.PIPELINE_OUTPUT_WORKERS
+            if queue_size is None:
+                queue_size = const.PIPELINE_QUEUE_SIZE
+
+            self.scanner = scanner
+            self.kwargs = kwargs
+
+            self.queues = [queue.Queue(maxsize=queue_size) for i in range(4)]
+            self.queues.append(queue.Queue())
+
+            self.stages = [
+                PipelineStage('decode', self.decode, self.queues[0], self.queues[1], decode_workers),
+                PipelineStage('detect', self.detect, self.queues[1], self.queues[2]),
+                PipelineStage('recognize', self.recognize, self.queues[2], self.queues[3]),
+                PipelineStage('output', self.output, self.queues[3], self.queues[4], output_workers)]
+
+            self.start_time = None
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'scanner_pipeline.py'))
+
+    def run(self, input_files, output_files=None):
+        """Passes all input images through the pipeline and waits for the results.
+
+        :param input_files:A list of input images (paths).
+        :param output_files:An optional list of output images (paths). If None, the annotated images are
+        returned in the results.
+        :return:A list of instances of the class ScanResult in the order of the input images.
+        """
+        try:
+            if output_files is None:
+                output_files = [None] * len(input_files)
+
+            self.start_time = time.time()
+
+            for stage in self.stages:
+                stage.start()
+
+            feeder = threading.Thread(target=self.feed, args=(input_files, output_files), daemon=True)
+            feeder.start()
+
+            results = [None] * len(input_files)
+
+            while True:
+                result = self.queues[-1].get()
+
+                if result is None:
+                    break
+
+                results[result.index] = result
+
+            return results
+        except:
+            print('Error in method {0} in module {1}'.format('run', 'scanner_pipeline.py'))
+            return None
+
+    def feed(self, input_files, output_files):
+        """Puts the input images into the first queue. Blocks as long as the queue is full.
+
+        :param input_files:A list of input images (paths).
+        :param output_files:A list of output images (paths or None).
+        """
+        try:
+            for index, (input_file, output_file) in enumerate(zip(input_files, output_files)):
+                self.queues[0].put(ScanResult(input_file, output_file, index))
+        except:
+            print('Error in method {0} in module {1}'.format('feed', 'scanner_pipeline.py'))
+        finally:
+            self.queues[0].put(None)
+
+    def statistics(self):
+        """Returns the current state of the pipeline. For each stage the number of processed images, the time
+        spent processing them, the throughput in images per second and the number of images waiting in front of
+        the stage are given.
+
+        :return:A dictionary with the name of the stage as key and a dictionary of values.
+        """
+        try:
+            elapsed = time.time() - self.start_time if self.start_time is not None else 0.0
+
+            statistics = {}
+            for stage in self.stages:
+                statistics[stage.name] = {'items': stage.items,
+                                          'busy': stage.busy,
+                                          'throughput': stage.items / elapsed if elapsed > 0 else 0.0,
+                                          'queue': stage.in_queue.qsize()}
+
+            return statistics
+        except:
+            print('Error in method {0} in module {1}'.format('statistics', 'scanner_pipeline.py'))
+            return None
+
+    def decode(self, result):
+        """Stage decode: Reads the input image.
+
+        :param result:The result of the image.
+        :return:The result with the image.
+        """
+        img_in = cv2.imread(result.input_file)
+
+        if img_in is not None:
+            result.image = img_in[:, :, ::-1]
+
+        return result
+
+    def detect(self, result):
+        """Stage detect: Finds the text areas of the image. If the result of the image is cached, the boxes,
+        texts and matches are taken from the cache instead. If the scanner has a stage store, the stored boxes
+        are used if their configuration did not change (see detect_staged of the scanner).
+
+        :param result:The result of the image.
+        :return:The result with the boxes.
+        """
+        if result.image is not None:
+            result.db_version = self.scanner.db.version
+
+            if self.scanner.cache is not None:
+                result.key = self.scanner.cache.key(result.image, result.db_version)
+                entry = self.scanner.cache.get(result.key)
+
+                if entry is not None:
+                    result.boxes, result.texts, result.matches = entry['boxes'], entry['texts'], entry['matches']
+                    return result
+
+            if self.scanner.stage_store is not None:
+                staged = self.scanner.detect_staged(result.image)
+
+                if staged is not None:
+                    result.stages = staged[:4]
+                    result.boxes, result.processed_area_ratio = staged[1]['boxes'], staged[4]
+
+                return result
+
+            measured = self.scanner.detector.scann_measured(result.image)
+
+            if measured is not None:
+                result.boxes, result.processed_area_ratio = measured
+
+        return result
+
+    def recognize(self, result):
+        """Stage recognize: Cuts out the text areas and predicts their texts. Images detected with the stage
+        store continue with their stored results (see recognize_staged of the scanner).
+
+        :param result:The result of the image.
+        :return:The result with the drawing files and texts.
+        """
+        if result.image is not None and result.texts is None:
+            if result.stages is not None:
+                recognized = self.scanner.recognize_staged(result.image, *result.stages)
+                result.stages = None
+            else:
+                recognized = self.scanner.recognize(result.image, result.boxes)
+
+            if recognized is not None:
+                result.crops, result.texts = recognized
+
+        return result
+
+    def output(self, result):
+        """Stage output: Matches the texts with the ingredients, annotates the image and writes it, if an
+        output image is given.
+
+        If the database was reloaded since the detection, cached matches are renewed with the current database.
+
+        :param result:The result of the image.
+        :return:The finished result.
+        """
+        if result.image is not None:
+            db = self.scanner.db
+
+            if result.matches is None or result.db_version != db.version:
+                cacheable = result.matches is None and result.db_version == db.version
+
+                result.matches = self.scanner.match(result.texts, result.boxes, db=db)
+                result.db_version = db.version
+
+                if result.key is not None and cacheable:
+                    self.scanner.cache.put(result.key, result.boxes, result.texts, result.matches)
+
+            img_out = self.scanner.annotate(result.image, result.boxes, result.crops, result.texts,
+                                            matches=result.matches, db=db, **self.kwargs)
+
+            if self.scanner.archive is not None:
+                self.scanner.archive.append(result, result.db_version)
+            result.crops = None
+            result.image = None
+
+            if img_out is not None:
+                if result.output_file is not None:
+                    result.success = cv2.imwrite(result.output_file, img_out)
+                else:
+                    result.image = img_out
+                    result.success = True
+
+        return result
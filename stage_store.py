@@ -0,0 +1,187 @@
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+
+import constant as const
+
+
+class StageStore:
+    """Stores the intermediate results of the scanner per image, so that a later examination of the same image
+    only repeats the stages whose configuration changed. The stages are:
+
+        forward:The pass through the detector model (score map and geo map), if the detector splits it off.
+        decode:The boxes decoded from the output of the model (thresholds, nms).
+        crops:The drawing files cut out of the image for each box.
+        recognize:The texts predicted by the recognizer.
+
+    Each stage is stored with a fingerprint of its configuration, which includes the fingerprints of the
+    previous stages. If the fingerprint of a stage changes, this and all following stages are repeated. For
+    example, changing EAST_NMS_THRES only repeats decode, crops and recognize, but not the pass through the model.
+
+    The results of an image are kept in a compressed NumPy file (npz) named after the hash of the image.
+    """
+
+    STAGES = ['forward', 'decode', 'crops', 'recognize']
+    """The stages in the order of their execution"""
+
+    def __init__(self, directory=None):
+        """The constructor.
+
+        :param directory:The directory of the files. Default = STAGE_STORE_DIR.
+        """
+        try:
+            self.directory = directory if directory is not None else const.STAGE_STORE_DIR
+
+            os.makedirs(self.directory, exist_ok=True)
+        except:
+            print('Error in method {0} in module {1}'.format('init', 'stage_store.py'))
+
+    def key(self, img):
+        """Returns the key of an image.
+
+        :param img:The decoded image (as np array).
+        :return:The key as hex string.
+        """
+        try:
+            img = np.ascontiguousarray(img)
+
+            digest = hashlib.sha1(str((img.shape, img.dtype.str)).encode('utf-8'))
+            digest.update(img.data)
+
+            return digest.hexdigest()
+        except:
+            print('Error in method {0} in module {1}'.format('key', 'stage_store.py'))
+            return None
+
+    def fingerprints(self, configs):
+        """Returns the fingerprints of the stages. The fingerprint of a stage is a hash of its configuration and
+        the fingerprint of the previous stage.
+
+        :param configs:A dictionary with the configuration (a dictionary) of each stage.
+        :return:A dictionary with the fingerprint of each stage.
+        """
+        try:
+            fingerprints = {}
+            previous = ''
+
+            for stage in StageStore.STAGES:
+                content = previous + json.dumps(configs.get(stage, {}), sort_keys=True, default=str)
+                previous = hashlib.sha1(content.encode('utf-8')).hexdigest()
+                fingerprints[stage] = previous
+
+            return fingerprints
+        except:
+            print('Error in method {0} in module {1}'.format('fingerprints', 'stage_store.py'))
+            return None
+
+    def valid_stages(self, shard, fingerprints):
+        """Returns the number of stages at the beginning whose stored results can be used, i.e. the position of
+        the earliest stage that has to be repeated.
+
+        :param shard:The stored results of an image (see load).
+        :param fingerprints:The current fingerprints of the stages.
+        :return:The number of valid stages (0 to 4).
+        """
+        try:
+            stored = shard.get('fingerprints', {})
+
+            for i, stage in enumerate(StageStore.STAGES):
+                if stored.get(stage) != fingerprints[stage]:
+                    return i
+
+            return len(StageStore.STAGES)
+        except:
+            print('Error in method {0} in module {1}'.format('valid_stages', 'stage_store.py'))
+            return 0
+
+    def path(self, key):
+        """Returns the path of the file of an image.
+
+        :param key:The key of the image.
+        :return:The path.
+        """
+        try:
+            return os.path.join(self.directory, key + '.npz')
+        except:
+            print('Error in method {0} in module {1}'.format('path', 'stage_store.py'))
+            return None
+
+    def load(self, key):
+        """Loads the stored results of an image.
+
+        :param key:The key of the image.
+        :return:A dictionary with the fingerprints and the results, empty if nothing is stored.
+        """
+        try:
+            path = self.path(key)
+
+            if not os.path.isfile(path):
+                return {}
+
+            with np.load(path) as data:
+                shard = {'fingerprints': {stage: str(data['fingerprint_' + stage])
+                                          for stage in StageStore.STAGES if 'fingerprint_' + stage in data}}
+
+                if 'score_map' in data:
+                    shard['score_map'] = data['score_map']
+                    shard['geo_map'] = data['geo_map']
+                    shard['ratios'] = tuple(data['ratios'])
+
+                if 'boxes' in data:
+                    shard['boxes'] = list(data['boxes'])
+
+                if 'crop_count' in data:
+                    shard['crops'] = [data['crop_' + str(i)] if 'crop_' + str(i) in data else None
+                                      for i in range(int(data['crop_count']))]
+
+                if 'texts' in data:
+                    shard['texts'] = [str(text) for text in data['texts']]
+
+            return shard
+        except:
+            print('Error in method {0} in module {1}'.format('load', 'stage_store.py'))
+            return {}
+
+    def save(self, key, shard):
+        """Stores the results of an image. Existing results are replaced.
+
+        :param key:The key of the image.
+        :param shard:A dictionary with the fingerprints and the results (see load).
+        """
+        try:
+            arrays = {'fingerprint_' + stage: np.array(fingerprint)
+                      for stage, fingerprint in shard.get('fingerprints', {}).items()}
+
+            if shard.get('score_map') is not None:
+                arrays['score_map'] = shard['score_map']
+                arrays['geo_map'] = shard['geo_map']
+                arrays['ratios'] = np.array(shard['ratios'])
+
+            if shard.get('boxes') is not None:
+                boxes = [np.asarray(box) for box in shard['boxes']]
+                arrays['boxes'] = np.stack(boxes) if len(boxes) > 0 else np.zeros((0, 4, 2), dtype=np.int32)
+
+            if shard.get('crops') is not None:
+                arrays['crop_count'] = np.array(len(shard['crops']))
+
+                for i, crop in enumerate(shard['crops']):
+                    if crop is not None:
+                        arrays['crop_' + str(i)] = crop
+
+            if shard.get('texts') is not None:
+                arrays['texts'] = np.array([text if text is not None else '' for text in shard['texts']], dtype=str)
+
+            buffer = io.BytesIO()
+            np.savez_compressed(buffer, **arrays)
+
+            # Write to a temporary file first, so that no half written file remains after a crash
+            path = self.path(key)
+            temp_path = path + '.' + str(os.getpid())
+            with open(temp_path, mode='wb') as file:
+                file.write(buffer.getvalue())
+            os.replace(temp_path, path)
+        except:
+            print('Error in method {0} in module {1}'.format('save', 'stage_store.py'))